@@ -5,6 +5,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 import ofdm_fonctions as ofdm
+import ofdm_canal as canal
 
 ################################################################################
 # Définition des paramètres de la transmission
@@ -55,26 +56,18 @@ Df=1000.0
 # nombre de symboles OFDM
 T=2
 
-# initialiser le signal émis 
-s = np.array([])
-# initialiser les symboles QPSK émis 
-symb_QPSK = np.array([])
-# pour chaque symbole OFDM
-for i in range(T):
-    # génération des symboles QPSK pour les 1705 sous-porteuses non-éteintes
-    QPSK=ofdm.gen_QPSK(Kmax-Kmin+1)
-    # concaténation des symboles QPSK
-    symb_QPSK=np.append(symb_QPSK,QPSK)
-    # modulation OFDM et introduction du retard fractionnaire
-    m=ofdm.modulation_OFDM(np.sqrt(Es)*QPSK,N,L,e)
-    # concaténation des symboles OFDM
-    s=np.append(s,m)
+# génération des symboles QPSK pour les 1705 sous-porteuses non-éteintes
+# de chacun des T symboles OFDM (une ligne par symbole OFDM)
+QPSK=np.reshape(ofdm.gen_QPSK(T*(Kmax-Kmin+1)),(T,Kmax-Kmin+1))
+# symboles QPSK émis
+symb_QPSK=QPSK.ravel()
+# modulation OFDM de la trame et introduction du retard fractionnaire
+s=ofdm.modulation_OFDM_trame(np.sqrt(Es)*QPSK,N,L,e).ravel()
 
 # introduction du retard
 s=np.append(np.zeros(theta),s)
 # introduction du décalage en fréquence 
-t=np.arange(len(s))*Ts
-s=s*np.exp(1j*2.0*np.pi*Df*t)
+s=ofdm.decalage_frequence(s,Df,Ts,N+L)
 # génération de la réponse impulsionnelle du canal 
 # (Dirac ou Rayleigh avec profil d'intensité exponentiellement décroissant)
 # d'étalement temporel Tm échantillons
@@ -82,10 +75,9 @@ Tm=10
 c=ofdm.reponse_canal(L,1,Tm)
 
 # génération d'un BABG complexe centré de variance N0
-n=np.random.normal(0,np.sqrt(N0/2),size=len(s)+len(c)-1)+\
-    1j*np.random.normal(0,np.sqrt(N0/2),size=len(s)+len(c)-1)
+n=ofdm.bruit_BABG(len(s)+len(c)-1,N0)
 # signal recu dans le domaine temporel
-y=np.convolve(s,c)+n
+y=canal.convolution_canal(s,c)+n
 
 ###########################################################
 # Tracé de la réponse impulsionnelle du canal
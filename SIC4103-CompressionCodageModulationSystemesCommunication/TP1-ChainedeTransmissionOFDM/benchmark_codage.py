@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: benchmark_codage.py
+# Ce script mesure le débit (Mbit/s d'information) du codeur convolutif et
+# du décodeur de Viterbi (entrées souples et dures) en fonction du nombre
+# de mots de code décodés en parallèle
+import time
+
+import numpy as np
+
+import ofdm_codage as codage
+
+################################################################################
+# Définition des paramètres
+################################################################################
+# bits d'information par mot de code (paquet de 188 octets)
+n=8*188
+# nombres de mots de code par lot
+lots=[1,8,64,256]
+# rendement du code
+rendement='1/2'
+# écart type du bruit sur les symboles BPSK +/-1
+sigma=0.7
+
+def chrono(f,nrep=3):
+    meilleur=np.inf
+    for r in range(nrep):
+        t0=time.perf_counter()
+        res=f()
+        meilleur=min(meilleur,time.perf_counter()-t0)
+    return meilleur,res
+
+rng=np.random.default_rng(0)
+print('%6s %12s %12s %12s %10s %10s'%('lot','codage','Viterbi','Viterbi','TEB','TEB'))
+print('%6s %12s %12s %12s %10s %10s'%('','Mbit/s','souple','dur','souple','dur'))
+for B in lots:
+    bits=rng.integers(0,2,size=(B,n),dtype=np.uint8)
+    t_cod,code=chrono(lambda: codage.codage_convolutif(bits,rendement))
+    y=1-2.0*code+sigma*rng.normal(size=code.shape)
+    llr=2*y/sigma**2
+    durs=(y<0).astype(np.uint8)
+    t_souple,bits_souple=chrono(lambda: codage.decodage_Viterbi(llr,n,rendement))
+    t_dur,bits_dur=chrono(lambda: codage.decodage_Viterbi(durs,n,rendement,dures=True))
+    print('%6d %12.2f %12.2f %12.2f %10.2e %10.2e'%(B,B*n/t_cod/1e6,B*n/t_souple/1e6,
+          B*n/t_dur/1e6,np.mean(bits_souple!=bits),np.mean(bits_dur!=bits)))
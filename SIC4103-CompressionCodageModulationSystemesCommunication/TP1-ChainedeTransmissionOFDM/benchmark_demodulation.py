@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: benchmark_demodulation.py
+# Ce script mesure le débit (symboles/s) de la modulation, des décisions
+# dures et du calcul des LLR max-log pour QPSK, 16-QAM et 64-QAM, et le
+# compare à celui de la démodulation OFDM (FFT) de la même trame
+import time
+
+import numpy as np
+
+import ofdm_fonctions as ofdm
+import ofdm_modulation as modulation
+
+################################################################################
+# Définition des paramètres
+################################################################################
+# nombre total de porteuses
+N=2048
+# nombre de sous-porteuses non-éteintes
+K=1705
+# nombre d'échantillons de l'intervalle de garde
+L=N//8
+# nombre de symboles OFDM par trame
+T=100
+# Energie moyenne par symbole
+Es=1
+# Rapport signal-sur-bruit (dB)
+EsN0dB=20
+N0=Es/np.power(10,EsN0dB/10)
+Ts=224e-6/N
+
+################################################################################
+# Mesure du temps d'exécution (meilleur de nrep essais)
+################################################################################
+def chrono(f,nrep=5):
+    meilleur=np.inf
+    for r in range(nrep):
+        t0=time.perf_counter()
+        res=f()
+        meilleur=min(meilleur,time.perf_counter()-t0)
+    return meilleur,res
+
+rng=np.random.default_rng(0)
+# canal de Rayleigh par sous-porteuse et gain de l'égaliseur
+H=(rng.normal(size=(T,K))+1j*rng.normal(size=(T,K)))/np.sqrt(2)
+gain=Es*np.abs(H)**2
+
+# référence: démodulation OFDM de la trame (FFT des T symboles)
+y=ofdm.modulation_OFDM_trame(np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K)),N,L,0.0).ravel()
+t_fft,Y=chrono(lambda: ofdm.demodulation_OFDM_trame(y,0,0.0,N,L,T,K,Ts))
+print('démodulation OFDM (FFT): %12.3e symboles/s'%(T*K/t_fft))
+
+print('%4s %-14s %14s %14s'%('M','étage','symboles/s','bits/s'))
+for M in modulation.ORDRES:
+    m=M.bit_length()-1
+    bits=rng.integers(0,2,size=(T,K*m),dtype=np.uint8)
+    t_mod,X=chrono(lambda: modulation.modulation_QAM(bits,M))
+    # symboles égalisés
+    Y=np.sqrt(Es)*H*X+np.reshape(ofdm.bruit_BABG(T*K,N0,rng),(T,K))
+    Z=Y/(np.sqrt(Es)*H)
+    t_dur,b_est=chrono(lambda: modulation.decision_bits(Z,M))
+    t_llr,llr=chrono(lambda: modulation.llr_maxlog(Z,M,N0,gain))
+    if not np.array_equal(llr<0,b_est==1):
+        raise AssertionError('signes des LLR différents des décisions dures (M=%d)'%M)
+    for nom,t in [('modulation',t_mod),('décision dure',t_dur),('LLR max-log',t_llr)]:
+        print('%4d %-14s %14.3e %14.3e'%(M,nom,T*K/t,T*K*m/t))
+    print('%4d %-14s %14.3e'%(M,'TEB',np.mean(b_est!=bits)))
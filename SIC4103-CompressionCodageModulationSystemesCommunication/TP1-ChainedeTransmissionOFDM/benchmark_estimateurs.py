@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: benchmark_estimateurs.py
+# Ce script compare les estimateurs de canal de ofdm_fonctions.ESTIMATEURS
+# (Kalman, moindres carrés + interpolation, LMMSE): débit en symboles OFDM
+# par seconde et erreur quadratique moyenne d'estimation du canal
+import time
+
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_fonctions as ofdm
+
+################################################################################
+# Définition des paramètres
+################################################################################
+# nombre total de porteuses
+N=2048
+# nombre de sous-porteuses non-éteintes
+K=1705
+# nombre d'échantillons de l'intervalle de garde
+L=N//8
+# indices des porteuses pilotes = 0,12,24,..
+PP=np.arange(0,K,12)
+# étalement temporel du canal (échantillons)
+Tm=10
+# Energie moyenne par symbole QPSK
+Es=1
+# nombre de symboles OFDM (un canal de Rayleigh par symbole)
+T=200
+# Rapports signal-sur-bruit (dB)
+EsN0dB_liste=[10,20,30]
+
+rng=np.random.default_rng(0)
+QPSK=np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K))
+c,H=canal.banque_canaux(T,L,1,Tm,N,rng)
+H=H[:,0:K]
+
+print('%6s %-13s %14s %12s %10s'%('EsN0dB','estimateur','symboles/s','EQM','EQM/N0'))
+for EsN0dB in EsN0dB_liste:
+    N0=Es/np.power(10,EsN0dB/10)
+    # observations sur les sous-porteuses non-éteintes
+    Y=np.sqrt(Es)*H*QPSK+np.reshape(ofdm.bruit_BABG(T*K,N0,rng),(T,K))
+    for nom in ofdm.ESTIMATEURS:
+        options=dict(Tm=Tm,N=N,L=L) if nom=='lmmse' else {}
+        # premier appel: remplissage des caches (gains, poids, matrice de Wiener)
+        ofdm.estimation_canal_selection(nom,Y[0:1],QPSK[0:1,PP],PP,Es,N0,**options)
+        meilleur=np.inf
+        for r in range(3):
+            t0=time.perf_counter()
+            H_est=ofdm.estimation_canal_selection(nom,Y,QPSK[:,PP],PP,Es,N0,**options)
+            meilleur=min(meilleur,time.perf_counter()-t0)
+        eqm=np.mean(np.abs(H_est-H)**2)
+        print('%6d %-13s %14.0f %12.3e %10.3f'%(EsN0dB,nom,T/meilleur,eqm,eqm/N0))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: benchmark_estimation.py
+# Ce script compare les temps de calcul des estimateurs de canal de Kalman
+# (séquentiel, par trame, gains précalculés, balayage parallèle)
+import time
+
+import numpy as np
+
+import ofdm_fonctions as ofdm
+
+################################################################################
+# Définition des paramètres
+################################################################################
+# nombre de sous-porteuses non-éteintes (mode 2k et mode 8k)
+K_modes=[1705,6817]
+# nombre de symboles OFDM par trame
+T=20
+# nombre de symboles OFDM traités par l'estimateur séquentiel
+T_seq=2
+# Energie moyenne par symbole QPSK
+Es=1
+# Rapport signal-sur-bruit (dB)
+EsN0dB=20
+# Densité spectrale monolatérale du bruit
+N0=Es/np.power(10,EsN0dB/10)
+
+################################################################################
+# Mesure du temps d'exécution (meilleur de nrep essais)
+################################################################################
+def chrono(f,nrep=3):
+    meilleur=np.inf
+    for r in range(nrep):
+        t0=time.perf_counter()
+        res=f()
+        meilleur=min(meilleur,time.perf_counter()-t0)
+    return meilleur,res
+
+for K in K_modes:
+    # indices des porteuses pilotes = 0,12,24,..
+    PP=np.arange(0,K,12)
+    # observations et pilotes aléatoires
+    Y=np.reshape(ofdm.gen_QPSK(T*K),(T,K))+\
+        np.sqrt(N0/2)*(np.random.normal(size=(T,K))+1j*np.random.normal(size=(T,K)))
+    QPSK_pilotes=np.reshape(ofdm.gen_QPSK(T*len(PP)),(T,len(PP)))
+
+    # estimateur séquentiel (référence), sur T_seq symboles OFDM
+    t_seq,H_ref=chrono(lambda: np.array([ofdm.estimation_canal(Y[i],
+        QPSK_pilotes[i],PP,Es,N0) for i in range(T_seq)]),nrep=1)
+    print('K=%d, T=%d symboles OFDM'%(K,T))
+    print('  %-10s %12.1f us/symbole'%('séquentiel',1e6*t_seq/T_seq))
+
+    # autres estimateurs sur la trame complète
+    ofdm.gains_Kalman(PP,K,Es,N0)
+    for nom,estimateur in [('trame',ofdm.estimation_canal_trame),
+                           ('cache',ofdm.estimation_canal_cache),
+                           ('balayage',ofdm.estimation_canal_scan)]:
+        t_est,H_est=chrono(lambda: estimateur(Y,QPSK_pilotes,PP,Es,N0))
+        ecart=np.max(np.abs(H_est[0:T_seq]-H_ref))
+        print('  %-10s %12.1f us/symbole   accélération %7.1f   écart max %.1e'%
+              (nom,1e6*t_est/T,t_seq/T_seq/(t_est/T),ecart))
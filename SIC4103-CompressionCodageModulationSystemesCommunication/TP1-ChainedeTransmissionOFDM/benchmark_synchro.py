@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: benchmark_synchro.py
+# Ce script mesure le débit (échantillons/s) de l'acquisition d'une trame
+# dans une longue capture: recherche du préambule par intercorrélation
+# (ofdm_synchro) et métrique temporelle sur l'intervalle de garde, et
+# compare les retards et décalages en fréquence estimés
+import time
+
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_fonctions as ofdm
+import ofdm_synchro as synchro
+
+################################################################################
+# Définition des paramètres
+################################################################################
+# nombre total de porteuses
+N=2048
+# nombre de sous-porteuses non-éteintes
+K=1705
+# nombre d'échantillons de l'intervalle de garde
+L=N//8
+Ts=224e-6/N
+# nombre de symboles OFDM de la trame
+T=10
+# Energie moyenne par symbole
+Es=1
+# Rapport signal-sur-bruit (dB)
+EsN0dB=10
+N0=Es/np.power(10,EsN0dB/10)
+# décalage en fréquence (espacements entre sous-porteuses)
+Df=2.3/(N*Ts)
+# longueurs de capture (échantillons), trame placée à la fin
+longueurs=[1<<18,1<<20,1<<22]
+
+def chrono(f,nrep=3):
+    meilleur=np.inf
+    for r in range(nrep):
+        t0=time.perf_counter()
+        res=f()
+        meilleur=min(meilleur,time.perf_counter()-t0)
+    return meilleur,res
+
+def metrique(y):
+    # la métrique est calculée sur toute la capture (position inconnue)
+    P=ofdm.metrique_temporelle(y,L,N,len(y)-N-L+1,normalisee=True)
+    theta=int(np.argmax(np.abs(P)))
+    return theta,-np.angle(P[theta])/(2.0*np.pi*N*Ts)
+
+def preambule(y):
+    r=synchro.synchronisation_preambule(y,N,L,K,Ts)
+    if r is None:
+        return -1,np.nan
+    return r['debut']+N+L,r['Df']
+
+rng=np.random.default_rng(0)
+X=np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K))
+trame=np.concatenate((synchro.preambule(N,L,K)[1],
+                      ofdm.modulation_OFDM_trame(X,N,L,0.0).ravel()))
+print('%10s %-10s %14s %10s %12s'%('capture','méthode','échant./s','erreur','erreur Df'))
+print('%10s %-10s %14s %10s %12s'%('','','','retard','(espac.)'))
+for n in longueurs:
+    theta=n-len(trame)+N+L
+    s=np.concatenate((np.zeros(n-len(trame),dtype=complex),trame))
+    s=ofdm.decalage_frequence(s,Df,Ts,N+L)
+    y=canal.convolution_canal(s,ofdm.reponse_canal(L,1,10,rng))[0:n]
+    y+=ofdm.bruit_BABG(n,N0,rng)
+    for nom,f in [('métrique',metrique),('préambule',preambule)]:
+        t,(theta_est,Df_est)=chrono(lambda: f(y))
+        print('%10d %-10s %14.3e %10d %12.3f'%(n,nom,n/t,theta_est-theta,
+              (Df_est-Df)*N*Ts))
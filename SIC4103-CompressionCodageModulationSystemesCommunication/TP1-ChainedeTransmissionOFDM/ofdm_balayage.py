@@ -0,0 +1,658 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_balayage.py
+# Ce script estime par Monte Carlo le TEB/TES de la chaîne de transmission OFDM
+# sur une grille de Es/N0, de canaux et de modes de synchronisation, en
+# répartissant les réalisations sur tous les coeurs disponibles
+#
+# exemple: python ofdm_balayage.py --EsN0dB 0 5 10 15 20 --mode 1 --Tm 10
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_codage as codage
+import ofdm_fonctions as ofdm
+import ofdm_modulation as modulation
+import ofdm_profil as profil
+import ofdm_resultats as stockage
+import ofdm_synchro as synchro
+
+################################################################################
+# Paramètres de la transmission (identiques à simu.py)
+################################################################################
+def parametres_OFDM():
+    # duree utile (s)
+    Tu=224e-6
+    # nombre total de porteuses
+    N=2048
+    # periode d'échantillonnage (s)
+    Ts=Tu/N
+    # retard (s) correspondant a un délai de propagation de 10 km
+    tau=10e3/3e8
+    # nombre d'échantillons retardés
+    theta=int(np.floor(tau/Ts))
+    # nombre d'échantillons de l'intervalle de garde
+    L=int((Tu/8)/Ts)
+    return dict(
+        N=N,
+        # indices de la premiere et de la derniere sous-porteuse utile
+        Kmin=0,
+        Kmax=1704,
+        Ts=Ts,
+        L=L,
+        # espacement des porteuses pilotes
+        pas_pilotes=12,
+        # Energie moyenne par symbole QPSK
+        Es=1,
+        theta=theta,
+        # retard fractionnaire
+        e=(tau-theta*Ts)/Ts,
+        # decalage en frequence (Hz)
+        Df=1000.0,
+        # fréquence Doppler maximale du canal de Rayleigh (Hz, 0: canal fixe
+        # pendant la trame) et nombre d'échantillons pendant lesquels le
+        # canal à effet Doppler est constant (1: variation à chaque
+        # échantillon, beaucoup plus lent; N+L: à chaque symbole OFDM)
+        fD=0.0,
+        pas_doppler=N+L,
+        # nombre de symboles OFDM par réalisation
+        T=10,
+        # précision des calculs de toute la chaîne ('complex128' ou 'complex64')
+        dtype='complex128',
+        # fenêtre de cohérence du canal en symboles OFDM (None: estimation
+        # du canal à chaque symbole OFDM)
+        coherence=None,
+        # estimateur du canal (voir ofdm_fonctions.ESTIMATEURS)
+        estimateur='kalman',
+        # nombre de points de la constellation des porteuses de données
+        # (4: QPSK, 16: 16-QAM, 64: 64-QAM); les pilotes restent en QPSK
+        M=4,
+        # rendement du code convolutif (voir ofdm_codage.POINCONNAGE; None:
+        # transmission non codée), taille des paquets codés (octets) et
+        # entrées du décodeur de Viterbi ('souple': LLR, 'dur': décisions)
+        rendement=None,
+        paquet=188,
+        decodage='souple',
+    )
+
+#####################################################################
+#
+#  Nombre d'octets de charge utile d'une trame de T symboles OFDM (un
+#  nombre entier de paquets si la transmission est codée)
+#
+####################################################################
+def capacite(p):
+    K=p['Kmax']-p['Kmin']+1
+    PP=np.arange(0,K,p['pas_pilotes'])
+    if p['rendement'] is None:
+        return modulation.capacite_octets(p['M'],p['T'],K,PP)
+    nb_bits=modulation.capacite_bits(p['M'],p['T'],K,PP)
+    return nb_bits//codage.longueur_codee(8*p['paquet'],p['rendement'])*p['paquet']
+
+#####################################################################
+#
+#  Émission d'une charge utile et passage par le canal, sans bruit
+#  (une trame de T symboles OFDM)
+#
+#  entrées:
+#  - p: dictionnaire des paramètres (parametres_OFDM + mode, Tm, synchro)
+#  - octets: charge utile (uint8), au plus capacite(p) octets; codée par
+#    paquets de p['paquet'] octets (le dernier complété par des 0) si
+#    p['rendement'] est donné
+#  - rng: générateur np.random.Generator (pilotes et canal)
+#
+#  sorties:
+#  - dictionnaire: y (signal reçu sans bruit), pilotes, et pour la
+#    réception des paquets codés: forme du code et nombre de bits
+#    d'information par paquet
+#
+####################################################################
+@profil.etage()
+def emission(p,octets,rng):
+    N,L,Ts,T,Es=p['N'],p['L'],p['Ts'],p['T'],p['Es']
+    K=p['Kmax']-p['Kmin']+1
+    PP=np.arange(0,K,p['pas_pilotes'])
+    dtype=p['dtype']
+
+    if p['rendement'] is not None and p['coherence'] is not None and \
+       p['decodage']=='souple':
+        raise ValueError('décodage souple non disponible avec coherence')
+
+    # émission: pilotes QPSK, charge utile sur les porteuses de données
+    pilotes=np.reshape(ofdm.gen_QPSK(T*len(PP),rng,dtype=dtype),(T,len(PP)))
+    e=dict(pilotes=pilotes,nb_octets=len(octets))
+    if p['rendement'] is None:
+        X=modulation.trame_octets(octets,p['M'],T,K,PP,pilotes,dtype)
+    else:
+        # codage des paquets (un mot de code par paquet)
+        nb_paquets=-(-len(octets)//p['paquet'])
+        paquets=np.zeros(nb_paquets*p['paquet'],dtype=np.uint8)
+        paquets[0:len(octets)]=octets
+        bits=np.unpackbits(np.reshape(paquets,(nb_paquets,-1)),axis=1)
+        code=codage.codage_convolutif(bits,p['rendement'])
+        # entrelacement des bits codés sur toute la trame
+        flux=np.zeros(modulation.capacite_bits(p['M'],T,K,PP),dtype=np.uint8)
+        flux[0:code.size]=code.ravel()
+        X=modulation.trame_bits(codage.entrelacer(flux),p['M'],T,K,PP,pilotes,dtype)
+        e.update(forme_code=code.shape,nb_bits=bits.shape[1])
+    s=ofdm.modulation_OFDM_trame(Es**0.5*X,N,L,p['e']).ravel()
+    if p['synchro']=='preambule':
+        # symbole de préambule connu devant la trame
+        s=np.concatenate((Es**0.5*synchro.preambule(N,L,K,dtype)[1],s))
+    # retard et décalage en fréquence
+    s=np.concatenate((np.zeros(p['theta'],dtype=dtype),s))
+    s=ofdm.decalage_frequence(s,p['Df'],Ts,N+L)
+    # canal (variant dans le temps si fD>0)
+    if p['mode']==1 and p['fD']>0:
+        c=canal.CanalDoppler(L,p['Tm'],p['fD'],Ts,pas=p['pas_doppler'],rng=rng,
+                             dtype=dtype)
+        e['y']=c.appliquer(s)
+    else:
+        c=ofdm.reponse_canal(L,p['mode'],p['Tm'],rng,dtype)
+        e['y']=canal.convolution_canal(s,c)
+
+    return e
+
+#####################################################################
+#
+#  Synchronisation temporelle et fréquentielle du signal reçu
+#
+#  sorties:
+#  - theta_est: indice du premier échantillon de la trame
+#  - Df_est: décalage en fréquence estimé (Hz)
+#
+####################################################################
+@profil.etage()
+def synchronisation(p,y):
+    N,L,Ts,T=p['N'],p['L'],p['Ts'],p['T']
+    K=p['Kmax']-p['Kmin']+1
+    if p['synchro']=='ideale':
+        theta_est,Df_est=p['theta'],p['Df']
+    elif p['synchro']=='preambule':
+        r=synchro.synchronisation_preambule(y,N,L,K,Ts)
+        if r is None:
+            # préambule manqué: la trame est démodulée au hasard
+            theta_est,Df_est=N+L,0.0
+        else:
+            theta_est,Df_est=r['debut']+N+L,r['Df']
+        theta_est=min(theta_est,len(y)-T*(N+L))
+    else:
+        P=ofdm.metrique_temporelle(y,L,N,N)
+        theta_est=int(np.argmax(np.abs(P)))
+        Df_est=-np.angle(P[theta_est])/(2.0*np.pi*N*Ts)
+
+    return theta_est,Df_est
+
+#####################################################################
+#
+#  Réception d'une trame: estimation du canal, égalisation, décisions
+#  (et décodage des paquets)
+#
+#  entrées:
+#  - p: dictionnaire des paramètres
+#  - e: sortie de emission
+#  - Y[T,K]: symboles démodulés (demodulation_OFDM_trame)
+#  - N0: variance du bruit
+#
+#  sorties:
+#  - octets_est: charge utile décidée (uint8)
+#
+####################################################################
+@profil.etage()
+def reception(p,e,Y,N0):
+    N,L,Es=p['N'],p['L'],p['Es']
+    K=p['Kmax']-p['Kmin']+1
+    PP=np.arange(0,K,p['pas_pilotes'])
+    pilotes=e['pilotes']
+
+    # estimation du canal et égalisation
+    options=dict(Tm=p['Tm'],N=N,L=L) if p['estimateur']=='lmmse' else {}
+    if p['coherence'] is None:
+        H_est=ofdm.estimation_canal_selection(p['estimateur'],Y,pilotes,PP,
+                                              Es,N0,**options)
+        Z=Y/H_est/Es**0.5
+    else:
+        Z=ofdm.egalisation_coherente(Y,pilotes,PP,Es,N0,p['coherence'],
+            estimateur=p['estimateur'],decider=False,**options)[0]
+
+    # décision des bits et regroupement en octets
+    if p['rendement'] is None:
+        return modulation.octets_trame(Z,p['M'],PP,e['nb_octets'])
+
+    # décodage de Viterbi des paquets (LLR ou décisions dures)
+    donnees=np.ones(K,dtype=bool)
+    donnees[PP]=False
+    if p['decodage']=='souple':
+        gain=Es*np.abs(H_est[:,donnees])**2
+        entree=modulation.llr_maxlog(Z[:,donnees],p['M'],N0,gain)
+    else:
+        entree=modulation.decision_bits(Z[:,donnees],p['M'])
+    entree=codage.desentrelacer(entree.ravel())
+    entree=np.reshape(entree[0:int(np.prod(e['forme_code']))],e['forme_code'])
+    bits=codage.decodage_Viterbi(entree,e['nb_bits'],p['rendement'],
+                                 dures=(p['decodage']=='dur'))
+    return np.packbits(bits,axis=1).ravel()[0:e['nb_octets']]
+
+#####################################################################
+#
+#  Transmission d'une charge utile par la chaîne OFDM
+#  (une trame de T symboles OFDM)
+#
+#  entrées:
+#  - p: dictionnaire des paramètres (parametres_OFDM + EsN0dB, mode, Tm,
+#    synchro)
+#  - octets: charge utile (uint8), voir emission
+#  - rng: générateur np.random.Generator (pilotes, canal et bruit)
+#
+#  sorties:
+#  - octets_est: charge utile décidée (uint8, même longueur que octets)
+#
+####################################################################
+def transmission(p,octets,rng):
+    N,L,Ts,T,Es=p['N'],p['L'],p['Ts'],p['T'],p['Es']
+    K=p['Kmax']-p['Kmin']+1
+    N0=Es/np.power(10,p['EsN0dB']/10)
+
+    e=emission(p,octets,rng)
+    y=e['y']
+    y+=ofdm.bruit_BABG(len(y),N0,rng,dtype=p['dtype'])
+    theta_est,Df_est=synchronisation(p,y)
+    Y=ofdm.demodulation_OFDM_trame(y,theta_est,Df_est,N,L,T,K,Ts)
+
+    return reception(p,e,Y,N0)
+
+#####################################################################
+#
+#  Transmission d'une charge utile pour plusieurs Es/N0 avec les mêmes
+#  nombres aléatoires (signal émis, canal et bruit)
+#
+#  Le signal reçu sans bruit est calculé une seule fois; un vecteur de
+#  bruit de variance unité est tiré puis mis à l'échelle de chaque N0.
+#  Avec la synchronisation idéale, la démodulation étant linéaire, seuls
+#  le signal sans bruit et le bruit sont démodulés:
+#     Y(N0)=Y_signal+sqrt(N0)*Y_bruit
+#  Les écarts de TEB entre points ne dépendent alors que du bruit
+#  (variance réduite par rapport à des tirages indépendants).
+#
+#  entrées:
+#  - p: dictionnaire des paramètres (parametres_OFDM + mode, Tm, synchro)
+#  - octets: charge utile (uint8), voir emission
+#  - rng: générateur np.random.Generator (pilotes, canal et bruit)
+#  - EsN0dB: liste des rapports signal-sur-bruit (dB)
+#
+#  sorties:
+#  - liste des octets_est, un par valeur de EsN0dB
+#
+####################################################################
+def transmission_RSB(p,octets,rng,EsN0dB):
+    N,L,Ts,T,Es=p['N'],p['L'],p['Ts'],p['T'],p['Es']
+    K=p['Kmax']-p['Kmin']+1
+
+    e=emission(p,octets,rng)
+    y=e['y']
+    bruit=ofdm.bruit_BABG(len(y),1.0,rng,dtype=p['dtype'])
+    if p['synchro']=='ideale':
+        theta_est,Df_est=synchronisation(p,y)
+        Y_signal=ofdm.demodulation_OFDM_trame(y,theta_est,Df_est,N,L,T,K,Ts)
+        Y_bruit=ofdm.demodulation_OFDM_trame(bruit,theta_est,Df_est,N,L,T,K,Ts)
+
+    octets_est=[]
+    for snr in EsN0dB:
+        N0=Es/np.power(10,snr/10)
+        ecart=np.asarray(np.sqrt(N0),dtype=y.real.dtype)
+        if p['synchro']=='ideale':
+            Y=Y_signal+ecart*Y_bruit
+        else:
+            # la synchronisation dépend du bruit: signal reçu complet
+            y_snr=y+ecart*bruit
+            theta_est,Df_est=synchronisation(p,y_snr)
+            Y=ofdm.demodulation_OFDM_trame(y_snr,theta_est,Df_est,N,L,T,K,Ts)
+        octets_est.append(reception(p,e,Y,N0))
+
+    return octets_est
+
+#####################################################################
+#
+#  Une réalisation de la chaîne de transmission (charge utile aléatoire
+#  remplissant la trame)
+#
+#  entrées:
+#  - p: dictionnaire des paramètres (parametres_OFDM + EsN0dB, mode, Tm,
+#    synchro)
+#  - graine: SeedSequence de la réalisation
+#
+#  sorties:
+#  - (erreurs binaires, bits, erreurs symboles, symboles, durée en s)
+#
+####################################################################
+def realisation(p,graine):
+    t0=time.perf_counter()
+    rng=np.random.default_rng(graine)
+
+    nb_octets=capacite(p)
+    octets=rng.integers(0,256,size=nb_octets,dtype=np.uint8)
+    octets_est=transmission(p,octets,rng)
+
+    return comptage(p,octets,octets_est)+(time.perf_counter()-t0,)
+
+#####################################################################
+#
+#  Une réalisation pour plusieurs Es/N0 (voir transmission_RSB)
+#
+#  sorties:
+#  - liste de (erreurs binaires, bits, erreurs symboles, symboles, durée
+#    en s), une par valeur de EsN0dB (durée partagée également)
+#
+####################################################################
+def realisation_RSB(p,EsN0dB,graine):
+    t0=time.perf_counter()
+    rng=np.random.default_rng(graine)
+
+    nb_octets=capacite(p)
+    octets=rng.integers(0,256,size=nb_octets,dtype=np.uint8)
+    liste=transmission_RSB(p,octets,rng,EsN0dB)
+
+    duree=(time.perf_counter()-t0)/len(EsN0dB)
+    return [comptage(p,octets,octets_est)+(duree,) for octets_est in liste]
+
+#####################################################################
+#
+#  Comptage des erreurs sur les octets (ou exclusif et comptage des bits)
+#
+#  sorties:
+#  - (erreurs binaires, bits, erreurs symboles, symboles)
+#
+####################################################################
+def comptage(p,octets,octets_est):
+    m=p['M'].bit_length()-1
+    nb_err_bits=modulation.erreurs_binaires(octets,octets_est)
+    nb_err_symb=modulation.erreurs_symboles(octets,octets_est,p['M'])
+
+    return nb_err_bits,8*len(octets),nb_err_symb,-(-8*len(octets)//m)
+
+#####################################################################
+#
+#  Exécution d'une tâche dans un processus de calcul, avec les
+#  statistiques de profilage de la tâche si le profilage est actif
+#
+#  sorties:
+#  - (résultat de f, statistiques ou None)
+#
+####################################################################
+def tache_profilee(f,*args):
+    if not profil.actif():
+        return f(*args),None
+    profil.reinitialiser()
+    resultat=f(*args)
+    return resultat,profil.statistiques()
+
+#####################################################################
+#
+#  Demi-largeur relative de l'intervalle de confiance à 95% du TEB
+#  (approximation gaussienne)
+#
+####################################################################
+def ic_relatif(erreurs,total):
+    if erreurs==0:
+        return np.inf
+    teb=erreurs/total
+    return 1.96*np.sqrt(teb*(1-teb)/total)/teb
+
+#####################################################################
+#
+#  Balayage Monte Carlo
+#
+#  entrées:
+#  - EsN0dB: liste des rapports signal-sur-bruit (dB)
+#  - modes: liste des types de canal de reponse_canal (0: Dirac, 1: Rayleigh)
+#  - Tm: liste des étalements temporels du canal (échantillons)
+#  - synchros: liste des modes de synchronisation ('ideale', 'metrique' ou
+#    'preambule')
+#  - erreurs_cible: arrêt d'un point dès que ce nombre d'erreurs binaires
+#    est atteint
+#  - precision: arrêt d'un point dès que la demi-largeur relative de
+#    l'intervalle de confiance à 95% du TEB est inférieure (None: inactif)
+#  - max_realisations: nombre maximal de réalisations par point
+#  - graine: graine de la SeedSequence racine (la graine d'une
+#    réalisation dérive de l'empreinte des paramètres du point et de son
+#    indice)
+#
+#  Les réalisations sont calculées par lots de nb_processus, mais les
+#  critères d'arrêt sont appliqués dans l'ordre des indices: un point
+#  retient les réalisations 0,1,...,r où r est le premier indice qui
+#  satisfait un critère, et les réalisations d'indice supérieur déjà
+#  calculées sont ignorées. Les résultats ne dépendent donc ni du nombre
+#  de processus, ni de la grille, ni des reprises.
+#
+#  - nb_processus: nombre de processus (None: tous les coeurs)
+#  - parametres: paramètres de la transmission (défaut: parametres_OFDM())
+#  - rsb_communs: si True, chaque réalisation est partagée par tous les
+#    Es/N0 d'un même (mode, Tm, synchro) (voir transmission_RSB): le
+#    signal émis et le canal ne sont calculés qu'une fois par réalisation
+#    pour toute la liste EsN0dB
+#  - base: fichier de la base de résultats (ofdm_resultats) ou None; les
+#    réalisations déjà enregistrées pour un point ne sont pas recalculées
+#    (reprise d'un balayage interrompu ou complété) et les nouvelles y
+#    sont ajoutées
+#
+#  sorties:
+#  - liste de dictionnaires (une ligne par point du balayage)
+#
+####################################################################
+def balayage(EsN0dB,modes=(1,),Tm=(10,),synchros=('ideale',),erreurs_cible=100,
+             precision=None,max_realisations=1000,graine=0,nb_processus=None,
+             parametres=None,rsb_communs=False,base=None):
+    if parametres is None:
+        parametres=parametres_OFDM()
+    if nb_processus is None:
+        nb_processus=os.cpu_count()
+
+    points=[]
+    groupes={}
+    for snr,mode,tm,mode_synchro in itertools.product(EsN0dB,modes,Tm,synchros):
+        p=dict(parametres,EsN0dB=snr,mode=mode,Tm=tm,synchro=mode_synchro)
+        # empreinte du point; les graines en dérivent, pas de la position
+        # du point dans la grille (ajouter un point ne change pas les autres)
+        cle=stockage.cle_parametres(p,graine=graine,rsb_communs=rsb_communs)
+        if rsb_communs:
+            # points ne différant que par Es/N0: réalisations communes
+            cle_graine=stockage.cle_parametres(dict(p,EsN0dB=None),graine=graine,
+                                               rsb_communs=True)
+        else:
+            cle_graine=cle
+        points.append(dict(cle=cle,graine=int(cle_graine[0:16],16),p=p,
+                           faites={},realisations=0,erreurs_bits=0,bits=0,
+                           erreurs_symboles=0,symboles=0,duree=0.0,fini=False))
+        groupes.setdefault(cle_graine,[]).append(points[-1])
+
+    # prise en compte des réalisations calculées consécutives (dans l'ordre
+    # des indices) jusqu'au premier indice qui termine le point
+    def accumuler(pt):
+        while not pt['fini'] and pt['realisations'] in pt['faites']:
+            eb,nb,es,ns,duree=pt['faites'][pt['realisations']]
+            pt['realisations']+=1
+            pt['erreurs_bits']+=eb
+            pt['bits']+=nb
+            pt['erreurs_symboles']+=es
+            pt['symboles']+=ns
+            pt['duree']+=duree
+            pt['fini']=termine(pt)
+
+    def termine(pt):
+        return (pt['erreurs_bits']>=erreurs_cible or
+                pt['realisations']>=max_realisations or
+                (precision is not None and
+                 ic_relatif(pt['erreurs_bits'],pt['bits'])<=precision))
+
+    # indices des lot prochaines réalisations manquant à l'un des points
+    # (au-delà des réalisations déjà retenues)
+    def prochaines(pts,lot):
+        indices=[]
+        for r in range(min(pt['realisations'] for pt in pts),max_realisations):
+            if len(indices)>=lot:
+                break
+            if any(r not in pt['faites'] for pt in pts):
+                indices.append(r)
+        return indices
+
+    # reprise: réalisations déjà enregistrées dans la base
+    if base is not None:
+        base=stockage.BaseResultats(base)
+        for pt in points:
+            base.declarer(pt['cle'],pt['p'],graine=graine,rsb_communs=rsb_communs)
+            for r,resultat in base.realisations(pt['cle']).items():
+                if r<max_realisations:
+                    pt['faites'][r]=resultat
+            accumuler(pt)
+
+    debut=time.perf_counter()
+    # le profilage actif dans ce processus l'est aussi dans les processus
+    # de calcul; leurs statistiques sont ajoutées à celles de ce processus
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nb_processus,
+            initializer=profil.activer,initargs=(profil.actif(),profil.memoire())) as pool:
+        actifs=[pt for pt in points if not pt['fini']]
+        while actifs:
+            # un lot de réalisations pour chaque point (ou groupe de points)
+            # non terminé
+            if rsb_communs:
+                lots=[[pt for pt in groupe if not pt['fini']] for groupe in groupes.values()]
+            else:
+                lots=[[pt] for pt in actifs]
+            taches={}
+            for pts in lots:
+                for r in prochaines(pts,nb_processus):
+                    pts_r=[pt for pt in pts if r not in pt['faites']]
+                    graine_r=np.random.SeedSequence(graine,spawn_key=(pts_r[0]['graine'],r))
+                    if rsb_communs:
+                        tache=pool.submit(tache_profilee,realisation_RSB,pts_r[0]['p'],
+                            [pt['p']['EsN0dB'] for pt in pts_r],graine_r)
+                    else:
+                        tache=pool.submit(tache_profilee,realisation,pts_r[0]['p'],graine_r)
+                    taches[tache]=(r,pts_r)
+            for tache in concurrent.futures.as_completed(taches):
+                r,pts_r=taches[tache]
+                resultat,stats=tache.result()
+                if stats is not None:
+                    profil.fusionner(stats)
+                if not rsb_communs:
+                    resultat=[resultat]
+                for pt,res in zip(pts_r,resultat):
+                    pt['faites'][r]=tuple(res)
+                if base is not None:
+                    base.enregistrer([(pt['cle'],r,res) for pt,res in zip(pts_r,resultat)])
+            # critères d'arrêt, dans l'ordre des indices
+            for pt in actifs:
+                accumuler(pt)
+            actifs=[pt for pt in actifs if not pt['fini']]
+    if base is not None:
+        base.fermer()
+    duree_totale=time.perf_counter()-debut
+
+    resultats=[]
+    for pt in points:
+        p=pt['p']
+        resultats.append(dict(
+            EsN0dB=p['EsN0dB'],mode=p['mode'],Tm=p['Tm'],synchro=p['synchro'],
+            realisations=pt['realisations'],
+            erreurs_bits=pt['erreurs_bits'],bits=pt['bits'],
+            TEB=pt['erreurs_bits']/pt['bits'],
+            erreurs_symboles=pt['erreurs_symboles'],symboles=pt['symboles'],
+            TES=pt['erreurs_symboles']/pt['symboles'],
+            duree_calcul=pt['duree'],duree_totale=duree_totale))
+    return resultats
+
+#####################################################################
+#
+#  Affichage / écriture CSV des résultats
+#
+####################################################################
+def ecrire_tableau(resultats,fichier=sys.stdout):
+    colonnes=list(resultats[0].keys())
+    ecrivain=csv.DictWriter(fichier,fieldnames=colonnes)
+    ecrivain.writeheader()
+    ecrivain.writerows(resultats)
+
+def afficher_tableau(resultats):
+    print('%8s %4s %5s %8s %6s %10s %10s %10s %10s %9s'%('EsN0dB','mode','Tm',
+          'synchro','real.','err.bits','TEB','err.symb','TES','calcul(s)'))
+    for r in resultats:
+        print('%8.2f %4d %5g %8s %6d %10d %10.3e %10d %10.3e %9.2f'%(r['EsN0dB'],
+              r['mode'],r['Tm'],r['synchro'],r['realisations'],r['erreurs_bits'],
+              r['TEB'],r['erreurs_symboles'],r['TES'],r['duree_calcul']))
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Balayage Monte Carlo TEB/TES OFDM')
+    parser.add_argument('--EsN0dB',type=float,nargs='+',default=[0,5,10,15,20])
+    parser.add_argument('--mode',type=int,nargs='+',default=[1])
+    parser.add_argument('--Tm',type=float,nargs='+',default=[10])
+    parser.add_argument('--synchro',nargs='+',default=['ideale'],
+                        choices=['ideale','metrique','preambule'])
+    parser.add_argument('--erreurs',type=int,default=100)
+    parser.add_argument('--precision',type=float,default=None)
+    parser.add_argument('--max-realisations',type=int,default=1000)
+    parser.add_argument('--T',type=int,default=10)
+    parser.add_argument('--graine',type=int,default=0)
+    parser.add_argument('--processus',type=int,default=None)
+    parser.add_argument('--dtype',default='complex128',
+                        choices=['complex128','complex64'])
+    parser.add_argument('--coherence',type=int,default=None)
+    parser.add_argument('--estimateur',default='kalman',choices=list(ofdm.ESTIMATEURS))
+    parser.add_argument('--M',type=int,default=4,choices=list(modulation.ORDRES))
+    parser.add_argument('--rendement',default=None,choices=list(codage.POINCONNAGE))
+    parser.add_argument('--decodage',default='souple',choices=['souple','dur'])
+    # canal de Rayleigh à effet Doppler: fréquence Doppler maximale (Hz) et
+    # nombre d'échantillons par valeur du canal (défaut: N+L)
+    parser.add_argument('--doppler',type=float,default=0.0)
+    parser.add_argument('--pas-doppler',type=int,default=None)
+    # réalisations communes à tous les Es/N0 (voir transmission_RSB)
+    parser.add_argument('--rsb-communs',action='store_true')
+    # base de résultats (reprise) et bases à y fusionner avant le balayage
+    parser.add_argument('--base',default=None)
+    parser.add_argument('--fusionner',nargs='+',default=[])
+    # profilage des étages (tableau en fin de balayage, et fichier JSON),
+    # avec mesure des octets alloués par étage (plus lent)
+    parser.add_argument('--profil',action='store_true')
+    parser.add_argument('--profil-json',default=None)
+    parser.add_argument('--profil-memoire',action='store_true')
+    parser.add_argument('--csv',default=None)
+    args=parser.parse_args()
+
+    parametres=parametres_OFDM()
+    parametres['T']=args.T
+    parametres['dtype']=args.dtype
+    parametres['coherence']=args.coherence
+    parametres['estimateur']=args.estimateur
+    parametres['M']=args.M
+    parametres['rendement']=args.rendement
+    parametres['decodage']=args.decodage
+    parametres['fD']=args.doppler
+    if args.pas_doppler is not None:
+        parametres['pas_doppler']=args.pas_doppler
+    if args.profil or args.profil_json is not None or args.profil_memoire:
+        profil.activer(memoire=args.profil_memoire)
+    if args.fusionner:
+        if args.base is None:
+            parser.error('--fusionner nécessite --base')
+        with stockage.BaseResultats(args.base) as base:
+            for chemin in args.fusionner:
+                print(chemin,': ',base.fusionner(chemin),' lignes ajoutées')
+    resultats=balayage(args.EsN0dB,args.mode,args.Tm,args.synchro,
+                       erreurs_cible=args.erreurs,precision=args.precision,
+                       max_realisations=args.max_realisations,graine=args.graine,
+                       nb_processus=args.processus,parametres=parametres,
+                       rsb_communs=args.rsb_communs,base=args.base)
+    afficher_tableau(resultats)
+    print('durée totale (s)= ',resultats[0]['duree_totale'])
+    if args.csv is not None:
+        with open(args.csv,'w',newline='') as f:
+            ecrire_tableau(resultats,f)
+    if profil.actif():
+        profil.tableau()
+        if args.profil_json is not None:
+            profil.ecrire_json(args.profil_json)
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_canal.py
+# Génération du canal à trajets multiples et application au signal émis
+import numpy as np
+
+import ofdm_fonctions as ofdm
+import ofdm_profil as profil
+
+#####################################################################
+#
+#  Banque de M réalisations du canal de Rayleigh
+#
+#  Même loi que reponse_canal (avec le même générateur, M=1 donne la même
+#  réalisation); le profil d'intensité est lu dans le cache de profil_canal.
+#
+#  entrées:
+#  - M: nombre de réalisations
+#  - L: longueur de la réponse impulsionnelle (en nombre d'échantillons)
+#  - mode: type de canal (0: Dirac, 1: Rayleigh exponentiellement décroissant)
+#  - Tm: étalement temporel du canal (en nombre d'échantillons)
+#  - N: nombre de points des réponses fréquentielles (None: non calculées)
+#  - rng: générateur np.random.Generator (None: état global np.random)
+#  - dtype: type des coefficients ('complex' ou 'complex64')
+#
+#  sorties:
+#  - c[M,L]: réponses impulsionnelles
+#  - H[M,N]: réponses fréquentielles (si N est donné)
+#
+####################################################################
+@profil.etage()
+def banque_canaux(M,L,mode,Tm,N=None,rng=None,dtype='complex'):
+   if rng is None:
+      rng=np.random
+   if mode==0:
+      c=np.zeros((M,L),dtype=dtype)
+      c[:,0]=1.0
+   else:
+      c=np.empty((M,L),dtype=dtype)
+      c.real=rng.normal(0,1,size=(M,L))
+      c.imag=rng.normal(0,1,size=(M,L))
+      c*=ofdm.profil_canal(L,Tm).astype(c.real.dtype)
+   if N is None:
+      return c
+
+   # réponses fréquentielles de toutes les réalisations en un seul appel
+   H=np.fft.fft(c,N,axis=1).astype(dtype,copy=False)
+   return c,H
+
+#####################################################################
+#
+#  Taille des blocs FFT de l'overlap-save pour un canal de L coefficients
+#
+####################################################################
+def taille_bloc(L):
+   return int(2**np.ceil(np.log2(8*L)))
+
+#####################################################################
+#
+#  Overlap-save sur un signal précédé de L-1 échantillons d'historique
+#
+#  entrées:
+#  - x: signal (historique de L-1 échantillons inclus)
+#  - C[...,B]: réponse(s) fréquentielle(s) du canal sur B points
+#  - L: longueur de la réponse impulsionnelle
+#  - B: taille des blocs FFT
+#
+#  sorties:
+#  - y[...,len(x)-L+1]: échantillons filtrés
+#
+####################################################################
+def overlap_save(x,C,L,B):
+   # nombre maximal d'échantillons complexes par lot de blocs traités
+   taille_lot=1<<22
+   H=B-L+1
+   n=len(x)-(L-1)
+   canaux=C.shape[:-1]
+   if n<=0:
+      return np.zeros(canaux+(0,),dtype=C.dtype)
+   nb_blocs=-(-n//H)
+   # blocs de B échantillons se chevauchant de L-1 (vue sans recopie)
+   x=np.concatenate((x,np.zeros((nb_blocs-1)*H+B-len(x),dtype=x.dtype)))
+   blocs=np.lib.stride_tricks.as_strided(x,shape=(nb_blocs,B),
+      strides=(H*x.strides[0],x.strides[0]),writeable=False)
+
+   y=np.empty(canaux+(nb_blocs*H,),dtype=C.dtype)
+   g=max(1,taille_lot//(B*max(1,int(np.prod(canaux)))))
+   for j in range(0,nb_blocs,g):
+      X=np.fft.fft(blocs[j:j+g],axis=-1)
+      Yb=np.fft.ifft(C[...,None,:]*X,axis=-1)[...,L-1:]
+      y[...,j*H:j*H+Yb.shape[-2]*H]=np.reshape(Yb,canaux+(-1,))
+
+   return y[...,0:n]
+
+#####################################################################
+#
+#  Convolution du signal émis par la réponse impulsionnelle du canal
+#
+#  Identique à np.convolve(s,c). Pour les canaux longs, la convolution
+#  est calculée par blocs FFT (overlap-save) lorsque le coût estimé est
+#  inférieur à celui de la convolution directe.
+#
+#  entrées:
+#  - s: signal émis
+#  - c[L] ou c[M,L]: réponse(s) impulsionnelle(s) du canal (M réalisations
+#    filtrées en un seul appel)
+#  - methode: 'auto', 'directe' ou 'fft'
+#  - B: taille des blocs FFT (défaut: taille_bloc(L))
+#
+#  sorties:
+#  - y[len(s)+L-1] ou y[M,len(s)+L-1]: signal en sortie du canal
+#
+####################################################################
+@profil.etage()
+def convolution_canal(s,c,methode='auto',B=None):
+   s=np.asarray(s)
+   c=np.asarray(c)
+   L=c.shape[-1]
+   dtype=np.result_type(s.dtype,c.dtype,np.complex64)
+   M=int(np.prod(c.shape[:-1]))
+   if B is None:
+      B=taille_bloc(L)
+
+   if methode=='auto':
+      # coûts estimés (produits complexes) des deux méthodes
+      nb_blocs=(len(s)+L-1)/(B-L+1)
+      cout_directe=len(s)*L*M
+      cout_fft=5*nb_blocs*B*np.log2(B)*(M+1)
+      methode='fft' if cout_fft<cout_directe else 'directe'
+
+   if methode=='directe':
+      if c.ndim==1:
+         return np.convolve(s,c).astype(dtype,copy=False)
+      y=np.empty(c.shape[:-1]+(len(s)+L-1,),dtype=dtype)
+      for m in np.ndindex(c.shape[:-1]):
+         y[m]=np.convolve(s,c[m])
+      return y
+
+   x=np.concatenate((np.zeros(L-1,dtype=dtype),s.astype(dtype,copy=False),
+                     np.zeros(L-1,dtype=dtype)))
+   C=np.fft.fft(c,B,axis=-1).astype(dtype,copy=False)
+   return overlap_save(x,C,L,B)
+
+#####################################################################
+#
+#  Convolution par le canal en flux (overlap-save bloc par bloc)
+#
+#  Les L-1 derniers échantillons de chaque bloc sont conservés pour le
+#  bloc suivant. La concaténation des sorties de filtrer() puis de vider()
+#  est égale à np.convolve(s,c).
+#
+#  entrées:
+#  - c[L] ou c[M,L]: réponse(s) impulsionnelle(s) du canal
+#  - B: taille des blocs FFT (défaut: taille_bloc(L))
+#
+####################################################################
+class ConvolutionFlux:
+   def __init__(self,c,B=None):
+      c=np.asarray(c)
+      self.L=c.shape[-1]
+      self.B=taille_bloc(self.L) if B is None else B
+      dtype=np.result_type(c.dtype,np.complex64)
+      self.C=np.fft.fft(c,self.B,axis=-1).astype(dtype,copy=False)
+      self.memoire=np.zeros(self.L-1,dtype=dtype)
+
+   # sorties: échantillons filtrés correspondant au bloc d'entrée
+   def filtrer(self,bloc):
+      x=np.concatenate((self.memoire,np.asarray(bloc,dtype=self.memoire.dtype)))
+      self.memoire=x[len(x)-(self.L-1):].copy()
+      return overlap_save(x,self.C,self.L,self.B)
+
+   # sorties: les L-1 derniers échantillons de la convolution
+   def vider(self):
+      return self.filtrer(np.zeros(self.L-1,dtype=self.memoire.dtype))
+
+#####################################################################
+#
+#  Canal de Rayleigh variant dans le temps (effet Doppler)
+#
+#  Chaque coefficient de la réponse impulsionnelle suit le modèle de
+#  Clarke/Jakes par somme de sinusoïdes:
+#     c_l(t)=sqrt(2)*a_l/sqrt(S)*somme_s exp(j(2*pi*fD*cos(alpha_ls)*t+phi_ls))
+#  avec alpha_ls, phi_ls uniformes sur [0,2*pi] et a_l le profil de
+#  profil_canal (même puissance moyenne que reponse_canal).
+#  Les trajectoires sont calculées par lots de taille bornée, sans boucle
+#  sur les échantillons.
+#  En flux, filtrer(bloc) et vider() s'utilisent comme ceux de
+#  ConvolutionFlux (le temps du canal avance avec les blocs filtrés).
+#
+#  entrées:
+#  - L: longueur de la réponse impulsionnelle (en nombre d'échantillons)
+#  - Tm: étalement temporel du canal (en nombre d'échantillons)
+#  - fD: fréquence Doppler maximale (Hz)
+#  - Ts: période d'échantillonnage (s)
+#  - nb_sinus: nombre de sinusoïdes S par coefficient
+#  - pas: nombre d'échantillons pendant lesquels le canal est constant
+#    (1: variation à chaque échantillon, N+L: à chaque symbole OFDM)
+#  - rng: générateur np.random.Generator (None: état global np.random)
+#  - dtype: type des coefficients ('complex' ou 'complex64')
+#
+####################################################################
+class CanalDoppler:
+   def __init__(self,L,Tm,fD,Ts,nb_sinus=16,pas=1,rng=None,dtype='complex'):
+      if rng is None:
+         rng=np.random
+      self.L=L
+      self.Ts=Ts
+      self.pas=pas
+      self.dtype=np.dtype(dtype)
+      self.a=np.sqrt(2.0/nb_sinus)*ofdm.profil_canal(L,Tm)
+      # fréquences Doppler et phases des sinusoïdes de chaque coefficient
+      self.f=fD*np.cos(rng.uniform(0,2.0*np.pi,size=(L,nb_sinus)))
+      self.phi=rng.uniform(0,2.0*np.pi,size=(L,nb_sinus))
+      # nombre d'instants traités par lot (mémoire bornée)
+      self.lot=max(1,(1<<22)//(L*nb_sinus))
+      # état du filtrage en flux: L-1 derniers échantillons d'entrée et
+      # instant du prochain échantillon
+      self.memoire=np.zeros(L-1,dtype=self.dtype)
+      self.n=0
+
+   #################################################################
+   #  Trajectoires des coefficients aux échantillons debut..debut+n-1
+   #
+   #  sorties:
+   #  - c[n,L]: réponse impulsionnelle à chaque échantillon
+   #################################################################
+   def coefficients(self,debut,n):
+      # instants distincts (un par période de pas échantillons)
+      indices=(debut+np.arange(n))//self.pas
+      instants=np.arange(indices[0],indices[-1]+1) if n>0 else indices
+      g=np.empty((len(instants),self.L),dtype=self.dtype)
+      for i in range(0,len(instants),self.lot):
+         t=instants[i:i+self.lot]*self.pas*self.Ts
+         phase=2.0*np.pi*t[:,None,None]*self.f+self.phi
+         g[i:i+self.lot]=np.sum(np.exp(1j*phase),axis=-1)*self.a
+      return g[indices-instants[0]] if n>0 else g
+
+   #################################################################
+   #  Application du canal au signal s, dont le premier échantillon
+   #  est émis à l'instant debut (en échantillons)
+   #
+   #  sorties:
+   #  - y[len(s)+L-1]: y[k]=somme_l c_l(debut+k)*s[k-l]
+   #################################################################
+   def appliquer(self,s,debut=0):
+      L=self.L
+      s=np.asarray(s,dtype=self.dtype)
+      n=len(s)+L-1
+      sp=np.concatenate((np.zeros(L-1,dtype=self.dtype),s,
+                         np.zeros(L-1,dtype=self.dtype)))
+      # fenetres[k]=s[k-L+1..k] (vue sans recopie)
+      fenetres=np.lib.stride_tricks.sliding_window_view(sp,L)
+      y=np.empty(n,dtype=self.dtype)
+      for k in range(0,n,self.lot):
+         c=self.coefficients(debut+k,min(self.lot,n-k))
+         y[k:k+len(c)]=np.einsum('il,il->i',c[:,::-1],fenetres[k:k+len(c)])
+      return y
+
+   # sorties: échantillons filtrés correspondant au bloc d'entrée
+   def filtrer(self,bloc):
+      L=self.L
+      x=np.concatenate((self.memoire,np.asarray(bloc,dtype=self.dtype)))
+      y=self.appliquer(x,self.n-(L-1))[L-1:len(x)]
+      self.memoire=x[len(x)-(L-1):].copy()
+      self.n+=len(x)-(L-1)
+      return y
+
+   # sorties: les L-1 derniers échantillons de la convolution
+   def vider(self):
+      return self.filtrer(np.zeros(self.L-1,dtype=self.dtype))
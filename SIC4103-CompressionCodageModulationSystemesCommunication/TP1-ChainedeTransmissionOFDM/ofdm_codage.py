@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_codage.py
+# Codage convolutif (rendement 1/2, longueur de contrainte 7, générateurs
+# 171 et 133 en octal, poinçonnage du DVB-T) et décodage de Viterbi
+# vectorisé sur les 64 états du treillis et sur un lot de mots de code
+import functools
+
+import numpy as np
+
+import ofdm_profil as profil
+
+# polynômes générateurs des sorties X et Y (bit de poids fort: entrée courante)
+GENERATEURS=(0o171,0o133)
+# longueur de contrainte et nombre d'états du treillis
+LONGUEUR_CONTRAINTE=7
+NB_ETATS=1<<(LONGUEUR_CONTRAINTE-1)
+
+# motifs de poinçonnage (sorties X et Y conservées sur une période)
+POINCONNAGE={
+   '1/2':((1,),(1,)),
+   '2/3':((1,0),(1,1)),
+   '3/4':((1,0,1),(1,1,0)),
+   '5/6':((1,0,1,0,1),(1,1,0,1,0)),
+   '7/8':((1,0,0,0,1,0,1),(1,1,1,1,0,1,0)),
+}
+
+#####################################################################
+#
+#  Masque de poinçonnage de n instants du treillis
+#
+#  entrées:
+#  - n: nombre d'instants (bits d'information et de fermeture)
+#  - rendement: clé de POINCONNAGE
+#
+#  sorties:
+#  - masque[2n]: bits conservés dans l'ordre X1 Y1 X2 Y2 ...
+#
+####################################################################
+def masque_poinconnage(n,rendement):
+   if rendement not in POINCONNAGE:
+      raise ValueError('rendement %r non disponible (%s)'%
+                       (rendement,', '.join(POINCONNAGE)))
+   motif=np.array(POINCONNAGE[rendement],dtype=bool).T
+   return np.resize(motif,(n,2)).ravel()
+
+#####################################################################
+#
+#  Nombre de bits codés (après fermeture et poinçonnage) d'un mot de
+#  code de n bits d'information
+#
+####################################################################
+def longueur_codee(n,rendement='1/2'):
+   return int(np.sum(masque_poinconnage(n+LONGUEUR_CONTRAINTE-1,rendement)))
+
+#####################################################################
+#
+#  Codage convolutif d'un lot de mots d'information
+#
+#  Le codeur part de l'état nul et y est ramené par 6 bits de fermeture.
+#
+#  entrées:
+#  - bits[...,n]: bits d'information (0 ou 1)
+#  - rendement: clé de POINCONNAGE
+#
+#  sorties:
+#  - code[...,longueur_codee(n)]: bits codés (uint8)
+#
+####################################################################
+@profil.etage()
+def codage_convolutif(bits,rendement='1/2'):
+   bits=np.asarray(bits,dtype=np.uint8)
+   m=LONGUEUR_CONTRAINTE-1
+   lot=bits.shape[:-1]
+   n=bits.shape[-1]+m
+   # u[...,m+k]=bit d'entrée à l'instant k (m zéros avant, m après)
+   u=np.zeros(lot+(n+m,),dtype=np.uint8)
+   u[...,m:m+bits.shape[-1]]=bits
+   code=np.zeros(lot+(n,2),dtype=np.uint8)
+   for j,g in enumerate(GENERATEURS):
+      for i in range(LONGUEUR_CONTRAINTE):
+         # prise sur l'entrée retardée de i instants
+         if (g>>(m-i))&1:
+            code[...,j]^=u[...,m-i:m-i+n]
+   code=np.reshape(code,lot+(2*n,))
+
+   return code[...,masque_poinconnage(n,rendement)]
+
+#####################################################################
+#
+#  Treillis du code (mis en cache)
+#
+#  L'état est formé des 6 dernières entrées, la plus récente en poids
+#  fort: l'entrée b fait passer de l'état s à l'état (b<<5)|(s>>1). Les
+#  deux prédécesseurs d'un état s' ne diffèrent que par leur bit de poids
+#  faible.
+#
+#  sorties:
+#  - predecesseurs[2,64]: prédécesseur ((s'&31)<<1)|x de chaque état s'
+#  - sorties[2,64]: indice 2*X+Y des bits codés de la transition
+#
+####################################################################
+@functools.lru_cache(maxsize=None)
+def treillis():
+   m=LONGUEUR_CONTRAINTE-1
+   etats=np.arange(NB_ETATS)
+   b=etats>>(m-1)
+   predecesseurs=np.array([((etats&(NB_ETATS//2-1))<<1)|x for x in (0,1)])
+   sorties=np.zeros((2,NB_ETATS),dtype=np.intp)
+   for x in (0,1):
+      registre=(b<<m)|predecesseurs[x]
+      for g in GENERATEURS:
+         parite=np.array([bin(r&g).count('1')&1 for r in registre])
+         sorties[x]=2*sorties[x]+parite
+   predecesseurs.flags.writeable=False
+   sorties.flags.writeable=False
+
+   return predecesseurs,sorties
+
+#####################################################################
+#
+#  Décodage de Viterbi d'un lot de mots de code
+#
+#  Les LLR (LLR>0 favorise le bit 0, convention de llr_maxlog) sont
+#  replacés dans le flux X1 Y1 X2 Y2 ... (LLR nul aux positions
+#  poinçonnées). À chaque instant, l'addition-comparaison-sélection porte
+#  sur les 64 états et tous les mots du lot en une seule opération; les
+#  décisions sont conservées pour la remontée, qui part de l'état nul.
+#
+#  entrées:
+#  - llr[...,longueur_codee(n)]: LLR des bits codés, ou bits décidés
+#    (0 ou 1) si dures=True
+#  - n: nombre de bits d'information par mot de code
+#  - rendement: clé de POINCONNAGE
+#  - dures: True si llr contient des décisions dures (par exemple
+#    ofdm_modulation.decision_bits)
+#
+#  sorties:
+#  - bits[...,n]: bits d'information décodés (uint8)
+#
+####################################################################
+@profil.etage()
+def decodage_Viterbi(llr,n,rendement='1/2',dures=False):
+   llr=np.asarray(llr)
+   if dures:
+      llr=1.0-2.0*llr.astype(np.float32)
+   lot=llr.shape[:-1]
+   B=int(np.prod(lot))
+   llr=np.reshape(llr,(B,llr.shape[-1]))
+   nt=n+LONGUEUR_CONTRAINTE-1
+   masque=masque_poinconnage(nt,rendement)
+   if llr.shape[-1]!=np.sum(masque):
+      raise ValueError('%d LLR au lieu de %d'%(llr.shape[-1],np.sum(masque)))
+   # dépoinçonnage
+   flux=np.zeros((B,2*nt),dtype=np.float32)
+   flux[:,masque]=llr
+   flux=np.reshape(flux,(B,nt,2))
+   # métriques de branche des 4 sorties (X,Y) possibles à chaque instant:
+   # corrélation (1-2X)*llr_X+(1-2Y)*llr_Y (lot sur le dernier axe, pour
+   # que les opérations portent sur des lignes contiguës)
+   signes=np.array([[1,1],[1,-1],[-1,1],[-1,-1]],dtype=np.float32)
+   metriques_branche=np.einsum('bkj,sj->ksb',flux,signes,order='C')
+
+   predecesseurs,sorties=treillis()
+   # les prédécesseurs de l'état s' sont les états 2*(s'&31)+x: les
+   # métriques sont rangées en D[x,j]=métrique de l'état 2*j+x pour que
+   # les prédécesseurs pairs (x=0) et impairs (x=1) soient contigus
+   D=np.full((2,NB_ETATS//2,B),-np.inf,dtype=np.float32)
+   D[0,0]=0
+   # D[s'&1,s'>>1] vu dans l'ordre naturel des états s'=32*b+2*jh+jl
+   D_naturel=np.transpose(np.reshape(D,(2,2,NB_ETATS//4,B)),(1,2,0,3))
+   c0=np.empty((2,NB_ETATS//2,B),dtype=np.float32)
+   c1=np.empty((2,NB_ETATS//2,B),dtype=np.float32)
+   decisions=np.empty((nt,NB_ETATS,B),dtype=bool)
+   # vues des tampons dans les formes utilisées par la boucle
+   decisions_c=np.reshape(decisions,(nt,)+c0.shape)
+   c0_naturel=np.reshape(c0,D_naturel.shape)
+   c1_naturel=np.reshape(c1,D_naturel.shape)
+   D0,D1=D[0],D[1]
+   pas=64
+   for debut in range(0,nt,pas):
+      # métriques de branche des transitions de pas instants
+      bm=metriques_branche[debut:debut+pas]
+      bm0=np.reshape(bm[:,sorties[0]],(len(bm),)+c0.shape)
+      bm1=np.reshape(bm[:,sorties[1]],(len(bm),)+c0.shape)
+      for k in range(len(bm)):
+         # addition-comparaison-sélection sur les 64 états du lot
+         np.add(D0,bm0[k],out=c0)
+         np.add(D1,bm1[k],out=c1)
+         np.greater(c1,c0,out=decisions_c[debut+k])
+         np.maximum(c0_naturel,c1_naturel,out=D_naturel)
+      # renormalisation (précision des métriques en float32)
+      D-=np.max(np.reshape(D,(NB_ETATS,B)),axis=0)
+
+   # remontée depuis l'état nul (code fermé)
+   bits=np.empty((nt,B),dtype=np.uint8)
+   etat=np.zeros(B,dtype=np.intp)
+   lignes=np.arange(B)
+   for k in range(nt-1,-1,-1):
+      bits[k]=etat>>(LONGUEUR_CONTRAINTE-2)
+      etat=((etat&(NB_ETATS//2-1))<<1)|decisions[k,etat,lignes]
+
+   bits=np.transpose(bits[0:n])
+   return np.reshape(bits[:,0:n],lot+(n,))
+
+#####################################################################
+#
+#  Entrelacement pseudo-aléatoire des bits codés d'une trame
+#
+#  Sur un canal sélectif en fréquence, les porteuses voisines subissent
+#  le même évanouissement: sans entrelacement, les bits codés consécutifs
+#  d'un mot de code sont effacés ensemble et le décodeur de Viterbi ne
+#  les corrige pas. La permutation (graine fixe, mise en cache pour
+#  chaque n) répartit ces bits sur toute la trame.
+#
+#  entrées:
+#  - x[...,n]: bits (entrelacer) ou LLR/bits reçus (desentrelacer)
+#
+#  sorties:
+#  - y[...,n]: y[...,i]=x[...,permutation[i]] (entrelacer), et
+#    l'opération inverse (desentrelacer)
+#
+####################################################################
+@functools.lru_cache(maxsize=8)
+def permutation_entrelacement(n):
+   permutation=np.random.default_rng(0x0FD3).permutation(n)
+   permutation.flags.writeable=False
+   return permutation
+
+@profil.etage()
+def entrelacer(x):
+   x=np.asarray(x)
+   return x[...,permutation_entrelacement(x.shape[-1])]
+
+@profil.etage()
+def desentrelacer(x):
+   x=np.asarray(x)
+   y=np.empty_like(x)
+   y[...,permutation_entrelacement(x.shape[-1])]=x
+   return y
@@ -1,27 +1,190 @@
 # -*- coding: utf-8 -*-
 # Nom du fichier: ofdm_fonctions.py
+import functools
+
 import numpy as np
 
+import ofdm_profil as profil
+
+# table de la constellation QPSK (codage de Gray): indice 2*b0+b1,
+# b0 signe de la partie réelle, b1 signe de la partie imaginaire
+QPSK_LUT=np.array([1+1j,1-1j,-1+1j,-1-1j])/np.sqrt(2)
+
 #####################################################################
 #
 #  Génération de N symboles QPSK aléatoires
 #  dans l'alphabet {-1-1j,-1+1j,+1-1j,+1+1j}/sqrt(2)
 #
+#  Les bits sont tirés par octets (4 symboles par octet) puis convertis
+#  en symboles par la table QPSK_LUT.
+#
 #  entrées:
 #  - N: nombre symboles
+#  - rng: générateur np.random.Generator (None: état global np.random)
+#  - out[N]: tampon de sortie complexe optionnel
+#  - dtype: type des symboles ('complex' ou 'complex64'), ignoré si out est donné
 #
 #  sorties:
 #  - symb_QPSK[N]: vecteur contenant les symboles
 #
 ####################################################################
-def gen_QPSK(N):
-   symb_QPSK=(2.0*np.round(np.random.rand(1,N))-1+\
-              1j*(2.0*np.round(np.random.rand(1,N))-1))/np.sqrt(2)
-   # transformer matrice de dimension (1,N) en un vecteur de dimension (N,)
-   symb_QPSK=np.squeeze(symb_QPSK)
+@profil.etage()
+def gen_QPSK(N,rng=None,out=None,dtype='complex'):
+   # octets aléatoires: 4 paires de bits par octet
+   nb_octets=(N+3)//4
+   if rng is None:
+      octets=np.random.randint(0,256,size=nb_octets).astype(np.uint8)
+   else:
+      octets=rng.integers(0,256,size=nb_octets,dtype=np.uint8)
+   indices=(octets[:,None]>>np.array([6,4,2,0],dtype=np.uint8))&3
+   if out is not None:
+      dtype=out.dtype
+   symb_QPSK=np.take(QPSK_LUT.astype(dtype,copy=False),indices.ravel()[0:N],out=out)
    
    return symb_QPSK
 
+#####################################################################
+#
+#  Génération d'un bruit blanc additif gaussien complexe centré
+#  de variance N0
+#
+#  entrées:
+#  - n: nombre d'échantillons
+#  - N0: variance du bruit
+#  - rng: générateur np.random.Generator (None: état global np.random)
+#  - out[n]: tampon de sortie complexe optionnel (rempli sur place)
+#  - dtype: type du bruit ('complex' ou 'complex64'), ignoré si out est donné
+#
+#  sorties:
+#  - b[n]: échantillons de bruit
+#
+####################################################################
+@profil.etage()
+def bruit_BABG(n,N0,rng=None,out=None,dtype='complex'):
+   if out is None:
+      out=np.empty(n,dtype=dtype)
+   # parties réelle et imaginaire vues comme un tableau réel de taille 2n
+   reel=out.view(out.real.dtype)
+   if rng is None:
+      reel[:]=np.random.normal(0,1,size=2*n)
+   else:
+      rng.standard_normal(out=reel,dtype=reel.dtype)
+   reel*=np.sqrt(N0/2)
+
+   return out
+
+#####################################################################
+#
+#  Phaseur du retard fractionnaire exp(-j*2*pi*e*k/N), k=0..K-1
+#  (mis en cache pour chaque (N,K,e))
+#
+#  entrées:
+#  - N: nombre de porteuses total
+#  - K: nombre de sous-porteuses non-éteintes
+#  - e: retard fractionnaire
+#  - dtype: type du phaseur ('complex' ou 'complex64')
+#
+#  sorties:
+#  - retard[K]: phaseur (lecture seule)
+#
+####################################################################
+def phaseur_retard(N,K,e,dtype='complex'):
+   return _phaseur_retard(int(N),int(K),float(e),np.dtype(dtype).str)
+
+@functools.lru_cache(maxsize=32)
+def _phaseur_retard(N,K,e,dtype):
+   retard=np.exp(-1j*2.0*np.pi*e*np.arange(K)/N).astype(dtype)
+   retard.flags.writeable=False
+
+   return retard
+
+#####################################################################
+#
+#  Phaseur d'un décalage en fréquence Df sur une période de M échantillons
+#  (mis en cache pour chaque (Df,Ts,M))
+#
+#  exp(j*2*pi*Df*Ts*(i*M+m)) = v[m]*exp(j*2*pi*Df*Ts*i*M): la phase d'un
+#  symbole OFDM (M=N+L) est celle de v multipliée par le phaseur du début
+#  du bloc (phaseur_blocs).
+#
+#  entrées:
+#  - Df: décalage en fréquence (Hz)
+#  - Ts: période d'échantillonnage (s)
+#  - M: période en échantillons
+#  - dtype: type du phaseur ('complex' ou 'complex64')
+#
+#  sorties:
+#  - v[M]: exp(j*2*pi*Df*Ts*m), m=0..M-1 (lecture seule)
+#
+####################################################################
+def phaseur_frequence(Df,Ts,M,dtype='complex'):
+   return _phaseur_frequence(float(Df),float(Ts),int(M),np.dtype(dtype).str)
+
+@functools.lru_cache(maxsize=32)
+def _phaseur_frequence(Df,Ts,M,dtype):
+   v=np.exp(1j*2.0*np.pi*Df*Ts*np.arange(M)).astype(dtype)
+   v.flags.writeable=False
+
+   return v
+
+#####################################################################
+#
+#  Phaseurs du début de nb blocs successifs de M échantillons
+#
+#  La phase est calculée en double précision puis convertie: des
+#  puissances successives d'une rotation en complex64 accumuleraient
+#  l'erreur d'arrondi (de l'ordre de 1e-3 rad après 10000 symboles OFDM).
+#
+#  entrées:
+#  - Df: décalage en fréquence (Hz)
+#  - Ts: période d'échantillonnage (s)
+#  - M: taille des blocs
+#  - nb: nombre de blocs
+#  - debut: indice du premier échantillon du premier bloc
+#  - dtype: type du phaseur ('complex' ou 'complex64')
+#
+#  sorties:
+#  - [nb]: exp(j*2*pi*Df*Ts*(debut+i*M)), i=0..nb-1
+#
+####################################################################
+def phaseur_blocs(Df,Ts,M,nb,debut=0,dtype='complex'):
+   k=debut+M*np.arange(nb,dtype=np.float64)
+   return np.exp(1j*2.0*np.pi*float(Df)*float(Ts)*k).astype(dtype)
+
+#####################################################################
+#
+#  Introduction d'un décalage en fréquence (sur place)
+#
+#  s[k] <- s[k]*exp(j*2*pi*Df*Ts*k), calculé par blocs de M échantillons
+#  à partir du phaseur précalculé de phaseur_frequence et du phaseur du
+#  début de chaque bloc (phaseur_blocs)
+#
+#  entrées:
+#  - s: signal dans le domaine temporel (modifié sur place)
+#  - Df: décalage en fréquence (Hz)
+#  - Ts: période d'échantillonnage (s)
+#  - M: taille des blocs (N+L: un symbole OFDM)
+#
+#  sorties:
+#  - s: signal décalé en fréquence
+#
+####################################################################
+@profil.etage()
+def decalage_frequence(s,Df,Ts,M):
+   v=phaseur_frequence(Df,Ts,M,s.dtype)
+   nb=len(s)//M
+   # début de chaque bloc, dernier bloc incomplet compris
+   debut=phaseur_blocs(Df,Ts,M,nb+1,0,s.dtype)
+   # blocs complets: phaseur du bloc i = v*debut[i]
+   blocs=np.reshape(s[0:nb*M],(nb,M))
+   blocs*=v
+   blocs*=debut[0:nb,None]
+   # dernier bloc incomplet
+   reste=len(s)-nb*M
+   s[nb*M:]*=v[0:reste]*debut[nb]
+
+   return s
+
 #####################################################################
 #
 #  Modulation OFDM
@@ -36,9 +199,10 @@ def gen_QPSK(N):
 #  - symb_QPSK[N]: vecteur contenant les symboles
 #
 ####################################################################
+@profil.etage()
 def modulation_OFDM(QPSK,N,L,e):
    # IFFT normalisée
-   retard=np.exp(-1j*2.0*np.pi*e*np.arange(len(QPSK))/N)
+   retard=phaseur_retard(N,len(QPSK),e)
    s=N*np.fft.ifft(QPSK*retard,N)/np.sqrt(N)
    # insertion de l'intervalle de garde
    tmp=s[len(s)-L:len(s)]
@@ -46,6 +210,78 @@ def modulation_OFDM(QPSK,N,L,e):
 
    return s
 
+#####################################################################
+#
+#  Modulation OFDM d'une trame complète (T symboles OFDM)
+#
+#  entrées:
+#  - QPSK[T,K]: matrice des symboles QPSK (une ligne par symbole OFDM)
+#  - N: nombre de porteuses total
+#  - L: nombre d'echantillons de l'intervalle de garde
+#  - e: retard fractionnaire
+#  - out[T,N+L]: tampon de sortie optionnel (pré-alloué)
+#
+#  sorties:
+#  - s[T,N+L]: symboles OFDM avec intervalle de garde, identiques
+#    ligne par ligne à modulation_OFDM (s.ravel() donne le signal émis),
+#    de même précision que QPSK (complex64 ou complex128) ou que out
+#
+####################################################################
+@profil.etage()
+def modulation_OFDM_trame(QPSK,N,L,e,out=None):
+   QPSK=np.atleast_2d(QPSK)
+   T,K=QPSK.shape
+   if out is None:
+      out=np.empty((T,N+L),dtype=np.result_type(QPSK.dtype,np.complex64))
+   # IFFT normalisée de tous les symboles en un seul appel
+   retard=phaseur_retard(N,K,e,out.dtype)
+   out[:,L:]=N*np.fft.ifft(QPSK*retard,N,axis=1)/float(np.sqrt(N))
+   # insertion de l'intervalle de garde par recopie des L derniers échantillons
+   out[:,:L]=out[:,N:N+L]
+
+   return out
+
+#####################################################################
+#
+#  Démodulation OFDM d'une trame complète (T symboles OFDM)
+#
+#  entrées:
+#  - y: signal reçu dans le domaine temporel
+#  - theta_est: retard estimé (début du premier symbole OFDM)
+#  - Df_est: décalage fréquentiel estimé (Hz)
+#  - N: nombre de porteuses total
+#  - L: nombre d'echantillons de l'intervalle de garde
+#  - T: nombre de symboles OFDM
+#  - K: nombre de sous-porteuses non-éteintes
+#  - Ts: période d'échantillonnage (s)
+#
+#  sorties:
+#  - Y[T,K]: observations sur les sous-porteuses non-éteintes
+#    (de même précision que y)
+#
+####################################################################
+@profil.etage()
+def demodulation_OFDM_trame(y,theta_est,Df_est,N,L,T,K,Ts):
+   theta_est=int(np.squeeze(theta_est))
+   Df_est=float(np.squeeze(Df_est))
+   y=np.asarray(y)
+   if theta_est<0 or theta_est+T*(N+L)>len(y):
+      raise ValueError("la trame de %d symboles OFDM dépasse le signal reçu"%T)
+   # vue (T,N+L) sur le signal reçu, sans recopie
+   trame=np.lib.stride_tricks.as_strided(y[theta_est:],shape=(T,N+L),
+      strides=((N+L)*y.strides[0],y.strides[0]),writeable=False)
+   # élimination de l'intervalle de garde
+   z=trame[:,L:]
+   # synchronisation fréquentielle: phase en theta_est+i*(N+L)+L+n, produit
+   # du phaseur précalculé (n) et du phaseur du début de chaque symbole
+   if Df_est!=0.0:
+      z=z*phaseur_frequence(-Df_est,Ts,N+L,y.dtype)[0:N]
+      z*=phaseur_blocs(-Df_est,Ts,N+L,T,theta_est+L,y.dtype)[:,None]
+   # démodulation de tous les symboles OFDM en un seul appel
+   Y=np.fft.fft(z,N,axis=1)/float(np.sqrt(N))
+
+   return Y[:,0:K].astype(y.dtype,copy=False)
+
 #####################################################################
 #
 #  Génération de la réponse impulsionnelle du canal
@@ -58,12 +294,17 @@ def modulation_OFDM(QPSK,N,L,e):
 #           exponentiellement decroissante d'energie unite
 #           d'étalement temporel Tm echantillons
 #  - Tm: étalement temporel du canal (en nombre d'échantillons)
+#  - rng: générateur np.random.Generator (None: état global np.random)
+#  - dtype: type des coefficients ('complex' ou 'complex64')
 #
 #  sorties:
 #  - c[L]: vecteur des coefficients de la réponse impulsionnelle du canal
 #
 ####################################################################
-def reponse_canal(L,mode,Tm):
+@profil.etage()
+def reponse_canal(L,mode,Tm,rng=None,dtype='complex'):
+   if rng is None:
+      rng=np.random
    # initialisation des coefficients de la réponse impulsionnelle du canal
    c=np.zeros(L,dtype='complex')
    # generation d'un Dirac
@@ -71,17 +312,36 @@ def reponse_canal(L,mode,Tm):
       c[0]=1.0
    # génération d'une réponse exponentiellement decroissante d'énergie unité
    else:
-      # énergie de chaque coefficients de la réponse impulsionnelle du canal
-      for k in range(L):
-         c[k]=np.exp(-k/Tm)
-      # normalisation de l'énergie moyenne du canal à 1
-      c=c/np.sqrt(np.sum(c))
       # canal de Rayleigh (trajets multiples indépendants)
-      tmp=np.random.normal(0,1,size=len(c))+\
-         1j*np.random.normal(0,1,size=len(c))
-      c=np.sqrt(0.5*c)*tmp
+      tmp=rng.normal(0,1,size=len(c))+\
+         1j*rng.normal(0,1,size=len(c))
+      c=profil_canal(L,Tm)*tmp
+
+   return c.astype(dtype,copy=False)
+
+#####################################################################
+#
+#  Profil d'intensité exponentiellement décroissant du canal
+#  (mis en cache pour chaque couple (L,Tm))
+#
+#  entrées:
+#  - L: longueur de la réponse impulsionnelle (en nombre d'échantillons)
+#  - Tm: étalement temporel du canal (en nombre d'échantillons)
+#
+#  sorties:
+#  - a[L]: écart-type par partie réelle/imaginaire de chaque coefficient
+#
+####################################################################
+@functools.lru_cache(maxsize=32)
+def profil_canal(L,Tm):
+   # énergie de chaque coefficients de la réponse impulsionnelle du canal
+   p=np.exp(-np.arange(L)/Tm)
+   # normalisation de l'énergie moyenne du canal à 1
+   p=p/np.sqrt(np.sum(p))
+   a=np.sqrt(0.5*p)
+   a.flags.writeable=False
 
-   return c
+   return a
 
 #####################################################################
 #
@@ -98,20 +358,14 @@ def reponse_canal(L,mode,Tm):
 #  - H_est[N]:réponse fréquentielle du canal sur les sous-porteuses non-éteintes
 #
 ####################################################################
+@profil.etage()
 def estimation_canal(Y,QPSK_pilotes,PP,Es,N0):
    # nombre de sous-porteuses non-éteintes
    N=len(Y)
 
-   # création des matrices d'observation
+   # création des matrices d'observation (nulles hors des porteuses pilotes)
    alphak=np.zeros(N,dtype='complex')
-   compt=0
-   for k in range(N):
-      # dans le cas d'une porteuse pilote
-      if k==PP[compt]:
-         alphak[k]=QPSK_pilotes[compt]*np.sqrt(Es)
-         compt=compt+1
-      else:
-         alphak[k]=0.0
+   alphak[PP]=QPSK_pilotes*np.sqrt(Es)
 
    # initialisation du filtre de Kalman
    x0=0
@@ -156,6 +410,538 @@ def estimation_canal(Y,QPSK_pilotes,PP,Es,N0):
    
    return H_est
 
+#####################################################################
+#
+#  Estimateur de canal dans le domaine frequenciel pour une trame complète
+#
+#  Même filtre de Kalman et même lisseur que estimation_canal: la récursion
+#  porte sur les sous-porteuses et chaque pas traite les T symboles OFDM
+#  de la trame simultanément.
+#
+#  entrées:
+#  - Y[K] ou Y[T,K]: observations bruitées sur les sous-porteuses non-éteintes
+#  - QPSK_pilotes[Npp] ou QPSK_pilotes[T,Npp]: symboles pilotes connus
+#  - PP: indices des porteuses pilotes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#
+#  sorties:
+#  - H_est[K] ou H_est[T,K]: réponse fréquentielle du canal pour chaque
+#    symbole OFDM (de même précision que Y)
+#
+####################################################################
+@profil.etage()
+def estimation_canal_trame(Y,QPSK_pilotes,PP,Es,N0):
+   Y=np.asarray(Y)
+   # un seul symbole OFDM: traité comme une trame de T=1 symbole
+   vecteur=(Y.ndim==1)
+   Y=np.atleast_2d(Y)
+   T,K=Y.shape
+
+   # matrices d'observation rangées par sous-porteuse: alphak[k,t]
+   alphak=np.zeros((K,T),dtype=Y.dtype)
+   alphak[PP,:]=np.transpose(np.atleast_2d(QPSK_pilotes))*np.sqrt(Es)
+   Yk=np.transpose(Y)
+
+   # initialisation du filtre de Kalman
+   x0=0
+   P0=1
+   R=float(N0)
+   rho=0.9
+   G=float(np.sqrt(1-rho**2))
+   F=1
+   Q=1
+
+   # Filtrage de Kalman (récursion avant)
+   xf=np.zeros((K,T),dtype=Y.dtype)
+   Pf=np.zeros((K,T),dtype=Y.dtype)
+   P_pred=np.zeros((K,T),dtype=Y.dtype)
+   x=np.full(T,x0,dtype=Y.dtype)
+   P=np.full(T,P0,dtype=Y.dtype)
+   for k in range(K):
+      H=alphak[k]
+      P_pred[k]=F*P*F+G*Q*G
+      Kk=P_pred[k]*np.conj(H)/(H*P_pred[k]*np.conj(H)+R)
+      x=F*x+Kk*(Yk[k]-H*F*x)
+      P=P_pred[k]-Kk*H*P_pred[k]
+      xf[k]=x
+      Pf[k]=P
+
+   # Lissage de Kalman pour l'interpolation (récursion arrière)
+   xb=np.zeros((K,T),dtype=Y.dtype)
+   xb[K-1]=xf[K-1]
+   for k in range(K-2,-1,-1):
+      Sk=Pf[k]*F/P_pred[k+1]
+      xb[k]=xf[k]+Sk*(xb[k+1]-F*xf[k])
+
+   # résultat
+   H_est=np.transpose(xb)
+
+   return H_est[0] if vecteur else H_est
+
+#####################################################################
+#
+#  Gains du filtre et du lisseur de Kalman de l'estimateur de canal
+#
+#  Les covariances Pf, P_pred, le gain de Kalman et le gain du lisseur ne
+#  dépendent que de (PP,K,Es,N0,rho), pas des observations (les pilotes
+#  QPSK sont de module 1). Ils sont calculés une seule fois par
+#  configuration et conservés dans un cache LRU borné; chaque entrée
+#  occupe O(K) (environ 4*8*K octets: 220 ko en mode 8k).
+#
+#  Avec F=1, la récursion avant s'écrit xf[k]=a[k]*xf[k-1]+b[k]*z[k] avec
+#  z[k]=conj(pilote)*Y[k] sur les porteuses pilotes (a=1, b=0 ailleurs):
+#  xf est constante entre deux pilotes et ne change qu'aux pilotes. La
+#  récursion arrière xb[k]=(1-S[k])*xf[k]+S[k]*xb[k+1] donne alors, pour
+#  k dans le segment du pilote j (de PP[j] au pilote suivant exclu):
+#     xb[k]=xf_j+w[k]*(xb_{j+1}-xf_j)
+#  où w[k] est le produit des S[m] de k à la fin du segment et xb_{j+1}
+#  l'estimée lissée au pilote suivant. Les deux récursions ne portent
+#  donc que sur les Npp pilotes.
+#
+#  entrées:
+#  - PP: indices des porteuses pilotes
+#  - K: nombre de sous-porteuses non-éteintes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#  - rho: coefficient de corrélation entre sous-porteuses voisines
+#  - dtype: précision des gains ('float64' ou 'float32')
+#
+#  sorties:
+#  - a[K], b[K]: coefficients de la récursion avant
+#  - S[K]: gains du lisseur (S[K-1]=0)
+#  - w[K]: poids du lisseur vers le pilote suivant (nuls après le
+#    dernier pilote)
+#  - segment[K]: indice j+1 du segment de chaque sous-porteuse (0 avant
+#    le premier pilote)
+#
+####################################################################
+def gains_Kalman(PP,K,Es,N0,rho=0.9,dtype='float64'):
+   return _gains_Kalman(tuple(int(p) for p in PP),int(K),float(Es),
+                        float(N0),float(rho),np.dtype(dtype).str)
+
+@functools.lru_cache(maxsize=32)
+def _gains_Kalman(PP,K,Es,N0,rho,dtype):
+   PP=np.array(PP,dtype=int)
+   pilote=np.zeros(K,dtype=bool)
+   pilote[PP]=True
+
+   # initialisation du filtre de Kalman
+   P0=1
+   R=N0
+   G=np.sqrt(1-rho**2)
+   Q=1
+
+   # récursion des covariances (F=1)
+   a=np.ones(K)
+   b=np.zeros(K)
+   Pf=np.zeros(K)
+   P_pred=np.zeros(K)
+   P=P0
+   for k in range(K):
+      P_pred[k]=P+G*Q*G
+      if pilote[k]:
+         g=P_pred[k]/(Es*P_pred[k]+R)
+         a[k]=1-g*Es
+         b[k]=g*np.sqrt(Es)
+      P=a[k]*P_pred[k]
+      Pf[k]=P
+   S=np.zeros(K)
+   S[0:K-1]=Pf[0:K-1]/P_pred[1:K]
+
+   # produits des gains du lisseur jusqu'à la fin de chaque segment
+   w=np.zeros(K)
+   produit=S[K-1]
+   w[K-1]=produit
+   for k in range(K-2,-1,-1):
+      produit=S[k]*(1.0 if pilote[k+1] else produit)
+      w[k]=produit
+   segment=np.searchsorted(PP,np.arange(K),side='right')
+
+   gains=tuple(v.astype(dtype) for v in (a,b,S,w))+(segment,)
+   for v in gains:
+      v.flags.writeable=False
+   return gains
+
+#####################################################################
+#
+#  Estimateur de canal utilisant les gains de Kalman précalculés
+#  (récursions sur les seuls pilotes par balayage_affine, puis
+#  interpolation par les poids w du lisseur)
+#
+#  entrées:
+#  - Y[K] ou Y[T,K]: observations bruitées sur les sous-porteuses non-éteintes
+#  - QPSK_pilotes[Npp] ou QPSK_pilotes[T,Npp]: symboles pilotes connus
+#  - PP: indices des porteuses pilotes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#  - rho: coefficient de corrélation entre sous-porteuses voisines
+#
+#  sorties:
+#  - H_est[K] ou H_est[T,K]: réponse fréquentielle estimée du canal
+#    (de même précision que Y)
+#
+####################################################################
+@profil.etage()
+def estimation_canal_cache(Y,QPSK_pilotes,PP,Es,N0,rho=0.9):
+   Y=np.asarray(Y)
+   K=Y.shape[-1]
+   a,b,S,w,segment=gains_Kalman(PP,K,Es,N0,rho,Y.real.dtype)
+   # observations pilotes ramenées au canal
+   z=np.conj(np.asarray(QPSK_pilotes,dtype=Y.dtype))*Y[...,PP]
+   # filtrage aux pilotes: xf_j=a[PP[j]]*xf_{j-1}+b[PP[j]]*z_j
+   xf=balayage_affine(np.broadcast_to(a[PP],z.shape),b[PP]*z)
+   # lissage aux pilotes: xb_j=(1-w[PP[j]])*xf_j+w[PP[j]]*xb_{j+1}
+   wp=w[PP]
+   xb=balayage_affine(np.broadcast_to(wp[::-1],z.shape),((1-wp)*xf)[...,::-1])[...,::-1]
+   # interpolation: segment 0 (avant le premier pilote) avec xf=0, et
+   # xb_{Npp}=0 (de poids nul) après le dernier pilote
+   zero=np.zeros(z.shape[:-1]+(1,),dtype=Y.dtype)
+   xf=np.concatenate((zero,xf),axis=-1)[...,segment]
+   xb=np.concatenate((xb,zero),axis=-1)[...,segment]
+   H_est=xf+w*(xb-xf)
+
+   return H_est
+
+#####################################################################
+#
+#  Poids d'interpolation des porteuses pilotes vers les K sous-porteuses
+#  (mis en cache pour chaque (PP,K,ordre))
+#
+#  Interpolation de Lagrange locale sur les ordre+1 pilotes les plus
+#  proches (ordre=1: linéaire, ordre=3: cubique), avec extrapolation
+#  aux bords.
+#
+#  entrées:
+#  - PP: indices des porteuses pilotes
+#  - K: nombre de sous-porteuses non-éteintes
+#  - ordre: degré du polynôme d'interpolation
+#
+#  sorties:
+#  - indices[K,ordre+1]: pilotes utilisés pour chaque sous-porteuse
+#  - poids[K,ordre+1]: poids d'interpolation
+#
+####################################################################
+def poids_interpolation(PP,K,ordre):
+   return _poids_interpolation(tuple(int(p) for p in PP),int(K),int(ordre))
+
+@functools.lru_cache(maxsize=32)
+def _poids_interpolation(PP,K,ordre):
+   PP=np.array(PP,dtype=float)
+   k=np.arange(K)
+   # premier pilote de la fenêtre de ordre+1 pilotes autour de k
+   j=np.searchsorted(PP,k,side='right')-1-(ordre-1)//2
+   j=np.clip(j,0,len(PP)-ordre-1)
+   indices=j[:,None]+np.arange(ordre+1)
+   x=PP[indices]
+   poids=np.ones((K,ordre+1))
+   for i in range(ordre+1):
+      for m in range(ordre+1):
+         if m!=i:
+            poids[:,i]*=(k-x[:,m])/(x[:,i]-x[:,m])
+   for v in (indices,poids):
+      v.flags.writeable=False
+
+   return indices,poids
+
+#####################################################################
+#
+#  Estimateur de canal par moindres carrés sur les pilotes et
+#  interpolation (coût O(K) par symbole OFDM)
+#
+#  entrées:
+#  - Y[K] ou Y[T,K]: observations bruitées sur les sous-porteuses non-éteintes
+#  - QPSK_pilotes[Npp] ou QPSK_pilotes[T,Npp]: symboles pilotes connus
+#  - PP: indices des porteuses pilotes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation (non utilisée)
+#  - ordre: 1 (interpolation linéaire) ou 3 (interpolation cubique)
+#
+#  sorties:
+#  - H_est[K] ou H_est[T,K]: réponse fréquentielle estimée du canal
+#
+####################################################################
+@profil.etage()
+def estimation_canal_LS(Y,QPSK_pilotes,PP,Es,N0,ordre=1):
+   Y=np.asarray(Y)
+   indices,poids=poids_interpolation(PP,Y.shape[-1],ordre)
+   # estimée moindres carrés sur les pilotes (pilotes de module 1)
+   H_LS=np.conj(np.asarray(QPSK_pilotes,dtype=Y.dtype))*Y[...,PP]/Es**0.5
+   H_est=np.sum(H_LS[...,indices]*poids.astype(Y.real.dtype),axis=-1)
+
+   return H_est
+
+#####################################################################
+#
+#  Matrice d'interpolation de Wiener de l'estimateur LMMSE
+#  (mise en cache pour chaque (PP,K,Tm,N0))
+#
+#  La corrélation fréquentielle du canal est celle du profil
+#  exponentiel de profil_canal: r[d]=somme_l E|c_l|^2 exp(-j*2*pi*l*d/N).
+#  W=R_HP*(R_PP+N0/Es*I)^-1
+#
+#  entrées:
+#  - PP: indices des porteuses pilotes
+#  - K: nombre de sous-porteuses non-éteintes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#  - Tm: étalement temporel du canal (en nombre d'échantillons)
+#  - N: nombre de porteuses total
+#  - L: longueur de la réponse impulsionnelle du canal
+#  - dtype: type de la matrice ('complex' ou 'complex64')
+#
+#  sorties:
+#  - W[K,Npp]: matrice de Wiener (lecture seule)
+#
+####################################################################
+def matrice_Wiener(PP,K,Es,N0,Tm,N,L,dtype='complex'):
+   return _matrice_Wiener(tuple(int(p) for p in PP),int(K),float(Es),float(N0),
+                          float(Tm),int(N),int(L),np.dtype(dtype).str)
+
+@functools.lru_cache(maxsize=32)
+def _matrice_Wiener(PP,K,Es,N0,Tm,N,L,dtype):
+   PP=np.array(PP)
+   # fonction de corrélation fréquentielle du canal
+   r=np.fft.fft(2*profil_canal(L,Tm)**2,N)
+   R_HP=r[(np.arange(K)[:,None]-PP[None,:])%N]
+   R_PP=r[(PP[:,None]-PP[None,:])%N]
+   # W=R_HP*(R_PP+N0/Es*I)^-1, calculée par résolution du système transposé
+   W=np.transpose(np.linalg.solve(np.transpose(R_PP+N0/Es*np.eye(len(PP))),
+                                  np.transpose(R_HP)))
+   W=W.astype(dtype)
+   W.flags.writeable=False
+
+   return W
+
+#####################################################################
+#
+#  Estimateur de canal LMMSE (moindres carrés sur les pilotes puis
+#  interpolation de Wiener; un produit matrice-vecteur par symbole OFDM)
+#
+#  entrées:
+#  - Y[K] ou Y[T,K]: observations bruitées sur les sous-porteuses non-éteintes
+#  - QPSK_pilotes[Npp] ou QPSK_pilotes[T,Npp]: symboles pilotes connus
+#  - PP: indices des porteuses pilotes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#  - Tm: étalement temporel supposé du canal (en nombre d'échantillons)
+#  - N: nombre de porteuses total
+#  - L: longueur de la réponse impulsionnelle du canal
+#
+#  sorties:
+#  - H_est[K] ou H_est[T,K]: réponse fréquentielle estimée du canal
+#
+####################################################################
+@profil.etage()
+def estimation_canal_LMMSE(Y,QPSK_pilotes,PP,Es,N0,Tm=10,N=2048,L=256):
+   Y=np.asarray(Y)
+   W=matrice_Wiener(PP,Y.shape[-1],Es,N0,Tm,N,L,Y.dtype)
+   H_LS=np.conj(np.asarray(QPSK_pilotes,dtype=Y.dtype))*Y[...,PP]/Es**0.5
+   H_est=H_LS@np.transpose(W)
+
+   return H_est
+
+#####################################################################
+#
+#  Égalisation avec réutilisation de l'estimée du canal
+#
+#  L'estimée du canal et l'égaliseur W=1/(sqrt(Es)*H_est) sont réutilisés
+#  pendant au plus M symboles OFDM. Pour chaque symbole, un test sur les
+#  seules porteuses pilotes compare la puissance du résidu
+#  Y[PP]-sqrt(Es)*H_est[PP]*pilotes à seuil*N0: au-delà, ou à la fin de
+#  la fenêtre de cohérence, le canal est ré-estimé.
+#
+#  entrées:
+#  - Y[T,K]: observations bruitées sur les sous-porteuses non-éteintes
+#  - QPSK_pilotes[T,Npp]: symboles pilotes connus du récepteur
+#  - PP: indices des porteuses pilotes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#  - M: nombre maximal de symboles OFDM utilisant la même estimée
+#  - seuil: seuil du test de dérive, en multiple de N0 (sur un canal
+#    statique le résidu vaut environ 2*N0: bruit + erreur d'estimation)
+#  - etat: (H_est,W,age) laissé par l'appel précédent, ou None
+#  - estimateur, options: estimateur du canal (voir estimation_canal_selection)
+#  - decider: False pour renvoyer les symboles égalisés sans décision QPSK
+#    (modulations QAM, calcul des LLR)
+#
+#  sorties:
+#  - QPSK_est[T,K]: décisions (symboles égalisés si decider=False)
+#  - etat: (H_est,W,age) à transmettre à l'appel suivant
+#  - nb_estimations: nombre d'estimations complètes du canal
+#
+####################################################################
+@profil.etage()
+def egalisation_coherente(Y,QPSK_pilotes,PP,Es,N0,M,seuil=3.0,etat=None,
+                          estimateur='kalman',decider=True,**options):
+   decideur=decision if decider else np.asarray
+   Y=np.atleast_2d(Y)
+   QPSK_pilotes=np.atleast_2d(QPSK_pilotes)
+   T,K=Y.shape
+   QPSK_est=np.empty(Y.shape,dtype=Y.dtype)
+   H_est,W,age=(None,None,M) if etat is None else etat
+   nb_estimations=0
+   t=0
+   while t<T:
+      if age<M:
+         # test de dérive sur les porteuses pilotes des symboles OFDM
+         # restant dans la fenêtre de cohérence
+         fin=min(T,t+M-age)
+         residu=Y[t:fin,PP]-Es**0.5*H_est[PP]*QPSK_pilotes[t:fin]
+         derive=np.mean(np.abs(residu)**2,axis=1)>seuil*N0
+         n=int(np.argmax(derive)) if np.any(derive) else fin-t
+         # égalisation des symboles précédant la première dérive
+         QPSK_est[t:t+n]=decideur(Y[t:t+n]*W)
+         age=age+n if t+n==fin else M
+         t+=n
+      else:
+         # estimation complète du canal et égaliseur associé
+         H_est=estimation_canal_selection(estimateur,Y[t],QPSK_pilotes[t],
+                                          PP,Es,N0,**options)
+         W=1/(Es**0.5*H_est)
+         QPSK_est[t]=decideur(Y[t]*W)
+         nb_estimations+=1
+         age=1
+         t+=1
+
+   return QPSK_est,(H_est,W,age),nb_estimations
+
+#####################################################################
+#
+#  Balayage parallèle (préfixe) d'une récursion affine
+#  x[k]=a[k]*x[k-1]+c[k], x[-1]=0, le long du dernier axe
+#
+#  Les applications affines x->a*x+c se composent de façon associative:
+#  (a2,c2)o(a1,c1)=(a2*a1,a2*c1+c2). Le préfixe est calculé en log2(K)
+#  étapes vectorisées (algorithme de Hillis-Steele).
+#
+#  entrées:
+#  - a[...,K], c[...,K]: coefficients de la récursion
+#
+#  sorties:
+#  - x[...,K]: solution de la récursion
+#
+####################################################################
+def balayage_affine(a,c):
+   a=np.array(a)
+   x=np.array(c)
+   K=x.shape[-1]
+   d=1
+   while d<K:
+      x[...,d:]=a[...,d:]*x[...,:K-d]+x[...,d:]
+      a[...,d:]=a[...,d:]*a[...,:K-d]
+      d=2*d
+
+   return x
+
+#####################################################################
+#
+#  Estimateur de canal de Kalman (filtre + lisseur) par balayages parallèles
+#
+#  La récursion de Riccati des covariances est une homographie de matrice
+#  [[R,R*q],[Es_k,Es_k*q+R]] (q=G*Q*G, Es_k=0 hors pilotes): ses préfixes
+#  sont des produits de matrices 2x2 calculés en log2(K) étapes. Les
+#  récursions avant et arrière sur les estimées sont affines et évaluées
+#  par balayage_affine. Résultat identique à estimation_canal aux erreurs
+#  d'arrondi près.
+#
+#  entrées:
+#  - Y[K] ou Y[T,K]: observations bruitées sur les sous-porteuses non-éteintes
+#  - QPSK_pilotes[Npp] ou QPSK_pilotes[T,Npp]: symboles pilotes connus
+#  - PP: indices des porteuses pilotes
+#  - Es: Energie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#  - rho: coefficient de corrélation entre sous-porteuses voisines
+#
+#  sorties:
+#  - H_est[K] ou H_est[T,K]: réponse fréquentielle estimée du canal
+#    (de même précision que Y)
+#
+####################################################################
+@profil.etage()
+def estimation_canal_scan(Y,QPSK_pilotes,PP,Es,N0,rho=0.9):
+   Y=np.asarray(Y)
+   K=Y.shape[-1]
+
+   # initialisation du filtre de Kalman
+   P0=1
+   R=N0
+   G=np.sqrt(1-rho**2)
+   Q=1
+   q=G*Q*G
+   Esk=np.zeros(K)
+   Esk[PP]=Es
+
+   # préfixes des homographies de la récursion de Riccati
+   m00=np.full(K,float(R))
+   m01=np.full(K,R*q)
+   m10=Esk.copy()
+   m11=Esk*q+R
+   d=1
+   while d<K:
+      n00=m00[d:]*m00[:K-d]+m01[d:]*m10[:K-d]
+      n01=m00[d:]*m01[:K-d]+m01[d:]*m11[:K-d]
+      n10=m10[d:]*m00[:K-d]+m11[d:]*m10[:K-d]
+      n11=m10[d:]*m01[:K-d]+m11[d:]*m11[:K-d]
+      # normalisation pour éviter les dépassements de capacité
+      norme=np.abs(n11)
+      m00[d:],m01[d:],m10[d:],m11[d:]=n00/norme,n01/norme,n10/norme,n11/norme
+      d=2*d
+   Pf=(m00*P0+m01)/(m10*P0+m11)
+   P_pred=np.concatenate(([P0],Pf[0:K-1]))+q
+
+   # coefficients des récursions avant et arrière
+   g=P_pred/(Esk*P_pred+R)
+   a=1-g*Esk
+   b=np.where(Esk>0,g*np.sqrt(Es),0.0)
+   S=np.zeros(K)
+   S[0:K-1]=Pf[0:K-1]/P_pred[1:K]
+   a,b,S=(v.astype(Y.real.dtype) for v in (a,b,S))
+
+   # filtrage (récursion avant)
+   z=np.zeros(Y.shape,dtype=Y.dtype)
+   z[...,PP]=np.conj(np.asarray(QPSK_pilotes,dtype=Y.dtype))*Y[...,PP]
+   xf=balayage_affine(np.broadcast_to(a,Y.shape),b*z)
+   # lissage (récursion arrière, sur l'axe retourné)
+   xb=balayage_affine(np.broadcast_to(S[::-1],Y.shape),((1-S)*xf)[...,::-1])
+   H_est=xb[...,::-1]
+
+   return H_est
+
+#####################################################################
+#
+#  Estimateurs de canal disponibles, de signature commune
+#  (Y,QPSK_pilotes,PP,Es,N0,**options)
+#
+####################################################################
+ESTIMATEURS={
+   'kalman':estimation_canal_cache,
+   'kalman_trame':estimation_canal_trame,
+   'kalman_scan':estimation_canal_scan,
+   'ls_lineaire':functools.partial(estimation_canal_LS,ordre=1),
+   'ls_cubique':functools.partial(estimation_canal_LS,ordre=3),
+   'lmmse':estimation_canal_LMMSE,
+}
+
+#####################################################################
+#
+#  Estimation du canal par l'estimateur de nom donné (voir ESTIMATEURS)
+#
+#  entrées:
+#  - nom: nom de l'estimateur
+#  - Y, QPSK_pilotes, PP, Es, N0: voir estimation_canal
+#  - options: paramètres propres à l'estimateur (ex: Tm, N, L pour 'lmmse')
+#
+#  sorties:
+#  - H_est: réponse fréquentielle estimée du canal
+#
+####################################################################
+@profil.etage()
+def estimation_canal_selection(nom,Y,QPSK_pilotes,PP,Es,N0,**options):
+   if nom not in ESTIMATEURS:
+      raise ValueError("estimateur inconnu: %s (choix: %s)"%(nom,', '.join(ESTIMATEURS)))
+   return ESTIMATEURS[nom](Y,QPSK_pilotes,PP,Es,N0,**options)
+
 #####################################################################
 #
 #  Filtre de Kalman
@@ -235,28 +1021,46 @@ def Kalman_smoother(xkk,Pkk,Pk1k,Fk,xk1l,Pk1l):
 #
 #  Calcul de la métrique temporelle pour d=0,1,..nb-1
 #
+#  P[d] = somme_{m=0}^{L-1} y[m+d]*conj(y[m+d+N]), calculée pour tous les
+#  délais à partir d'une somme cumulée du produit de corrélation au
+#  retard N (coût O(nb+L) au lieu de O(nb*L)). Les sommes cumulées sont
+#  accumulées en double précision quelle que soit la précision de y: en
+#  complex64, leur erreur d'arrondi croîtrait avec la longueur du signal.
+#
 #  entrées:
-#  - y: sortie du canal dans le domaine temporel
+#  - y: sortie du canal dans le domaine temporel (au moins N+nb+L-1
+#    échantillons)
 #  - L: nombre d'échantillons de l'intervalle de garde
 #  - N: nombre total de sous-porteuses
 #  - nb: nombre de valeurs pour le délai
+#  - normalisee: si True, P[d] est divisée par l'énergie moyenne des deux
+#    fenêtres corrélées (|P[d]|<=1 quel que soit le RSB)
 #
 #  sorties:
 #  - P[nb]: vecteur des valeurs de la métrique temporelle 
+#    (de même précision que y)
 #
 ####################################################################
-def metrique_temporelle(y,L,N,nb):
-   # initialiser un vecteur pour les valeurs de la métrique temporelle 
-   P=np.zeros(nb,dtype='complex')
-
-   # pour chaque valeur du délai
-   for d in range(nb):
-      P[d]=0.0
-      for m in range(L):
-         P[d]+=y[m+d]*np.conj(y[m+d+N])
-      """ code python manquant """
+@profil.etage()
+def metrique_temporelle(y,L,N,nb,normalisee=False):
+   y=np.asarray(y)
+   if len(y)<N+nb+L-1:
+      raise ValueError("métrique temporelle sur %d délais: %d échantillons "
+                       "reçus au lieu d'au moins N+nb+L-1=%d"%(nb,len(y),N+nb+L-1))
+   # produit de corrélation au retard N sur les nb+L-1 échantillons utiles
+   r=y[0:nb+L-1]*np.conj(y[N:N+nb+L-1])
+   # somme glissante sur L échantillons par différence de sommes cumulées
+   cs=np.concatenate((np.zeros(1,dtype=np.complex128),np.cumsum(r,dtype=np.complex128)))
+   P=cs[L:L+nb]-cs[0:nb]
+
+   if normalisee:
+      # énergie des deux fenêtres de L échantillons séparées de N
+      e=np.abs(y[0:N+nb+L-1])**2
+      ce=np.concatenate((np.zeros(1),np.cumsum(e,dtype=np.float64)))
+      E=0.5*(ce[L:L+nb]-ce[0:nb]+ce[N+L:N+L+nb]-ce[N:N+nb])
+      P=np.divide(P,E,out=np.zeros(nb,dtype=P.dtype),where=E>0)
          
-   return P
+   return P.astype(r.dtype,copy=False)
 
 #####################################################################
 #
@@ -270,7 +1074,26 @@ def metrique_temporelle(y,L,N,nb):
 #  - res: décisions optimale
 #
 ####################################################################
+@profil.etage()
 def decision(r):
    """ code python manquant """
-   d=( np.sign(np.real(r))+1j*np.sign(np.imag(r)) )/np.sqrt(2)
+   d=( np.sign(np.real(r))+1j*np.sign(np.imag(r)) )/float(np.sqrt(2))
    return d
+
+#####################################################################
+#
+#  Nombre de symboles QPSK erronés, par comparaison des signes (les
+#  décisions et les symboles émis peuvent être de précisions différentes)
+#
+#  entrées:
+#  - QPSK_est: décisions
+#  - QPSK: symboles émis (même forme)
+#
+#  sorties:
+#  - nombre de symboles dont le signe de la partie réelle ou imaginaire
+#    diffère
+#
+####################################################################
+def erreurs_QPSK(QPSK_est,QPSK):
+   return int(np.count_nonzero((np.sign(np.real(QPSK_est))!=np.sign(np.real(QPSK)))|
+                               (np.sign(np.imag(QPSK_est))!=np.sign(np.imag(QPSK)))))
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_iq.py
+# Enregistrement et relecture de captures IQ (échantillons I/Q entrelacés
+# complex64 ou int16, métadonnées dans un fichier JSON voisin); la lecture
+# passe par np.memmap pour traiter des enregistrements plus grands que la
+# mémoire fenêtre par fenêtre
+import json
+
+import numpy as np
+
+import ofdm_fonctions as ofdm
+
+# formats des échantillons: type d'une composante I ou Q (petit-boutiste)
+FORMATS={'complex64':'<f4','int16':'<i2'}
+# pleine échelle des captures int16
+PLEINE_ECHELLE=32767
+
+#####################################################################
+#
+#  Nom du fichier de métadonnées d'une capture (fichier + '.json')
+#
+####################################################################
+def fichier_metadonnees(fichier):
+   return str(fichier)+'.json'
+
+#####################################################################
+#
+#  Enregistrement d'une capture IQ bloc par bloc
+#
+#  Les blocs sont écrits à la suite (I0 Q0 I1 Q1 ...) sans être conservés
+#  en mémoire; le fichier de métadonnées est écrit par fermer() (ou à la
+#  sortie d'un bloc with).
+#  En int16, un échantillon d'amplitude echelle (sur I ou Q) correspond à
+#  la pleine échelle; les composantes au-delà sont saturées et comptées.
+#
+#  entrées:
+#  - fichier: chemin de la capture
+#  - Ts: période d'échantillonnage (s)
+#  - N, L, Kmax: paramètres OFDM de la capture
+#  - Df: décalage en fréquence (Hz) connu à l'enregistrement
+#  - format: clé de FORMATS
+#  - echelle: amplitude de pleine échelle (int16)
+#  - metadonnees: autres champs JSON (graine, Es/N0, ...)
+#
+####################################################################
+class EnregistreurIQ:
+   def __init__(self,fichier,Ts,N,L,Kmax,Df=0.0,format='complex64',echelle=1.0,
+                **metadonnees):
+      if format not in FORMATS:
+         raise ValueError('format %r non disponible (%s)'%
+                          (format,', '.join(FORMATS)))
+      self.fichier=fichier
+      self.format=format
+      self.echelle=float(echelle)
+      self.metadonnees=dict(metadonnees,fe=1.0/Ts,N=int(N),L=int(L),
+                            Kmax=int(Kmax),Df=float(Df))
+      self.nb_echantillons=0
+      self.saturations=0
+      self.flux=open(fichier,'wb')
+
+   # entrées: échantillons complexes du bloc (taille quelconque)
+   def ecrire(self,bloc):
+      bloc=np.asarray(bloc)
+      if self.format=='complex64':
+         iq=bloc.astype('<c8',copy=False)
+      else:
+         x=np.empty((len(bloc),2))
+         x[:,0]=bloc.real
+         x[:,1]=bloc.imag
+         x*=PLEINE_ECHELLE/self.echelle
+         np.rint(x,out=x)
+         self.saturations+=int(np.count_nonzero(np.abs(x)>PLEINE_ECHELLE))
+         np.clip(x,-PLEINE_ECHELLE,PLEINE_ECHELLE,out=x)
+         iq=x.astype('<i2')
+      iq.tofile(self.flux)
+      self.nb_echantillons+=len(bloc)
+
+   # sorties: métadonnées écrites dans le fichier JSON
+   def fermer(self):
+      if not self.flux.closed:
+         self.flux.close()
+         self.metadonnees.update(format=self.format,echelle=self.echelle,
+            nb_echantillons=self.nb_echantillons,saturations=self.saturations)
+         with open(fichier_metadonnees(self.fichier),'w') as f:
+            json.dump(self.metadonnees,f,indent=1)
+      return self.metadonnees
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self,*exc):
+      self.fermer()
+
+#####################################################################
+#
+#  Enregistrement d'un signal complet (voir EnregistreurIQ)
+#
+#  entrées:
+#  - echelle: pleine échelle int16 (None: maximum de |I| et |Q|)
+#
+#  sorties:
+#  - métadonnées écrites
+#
+####################################################################
+def ecrire_iq(fichier,x,Ts,N,L,Kmax,Df=0.0,format='complex64',echelle=None,
+              **metadonnees):
+   x=np.asarray(x)
+   if echelle is None:
+      echelle=1.0
+      if format=='int16' and len(x)>0:
+         echelle=max(float(np.max(np.abs(x.real))),float(np.max(np.abs(x.imag))))
+         echelle=echelle if echelle>0 else 1.0
+   with EnregistreurIQ(fichier,Ts,N,L,Kmax,Df,format,echelle,**metadonnees) as e:
+      e.ecrire(x)
+   return e.metadonnees
+
+#####################################################################
+#
+#  Capture IQ en lecture (np.memmap, rien n'est chargé à l'ouverture)
+#
+#  Les attributs Ts, N, L, Kmax, Df et metadonnees sont lus dans le
+#  fichier JSON. lire(debut,fin) renvoie les échantillons complex64 de
+#  [debut,fin): une vue de la projection mémoire en complex64, une copie
+#  remise à l'échelle en int16.
+#
+#  entrées:
+#  - fichier: chemin de la capture
+#
+####################################################################
+class CaptureIQ:
+   def __init__(self,fichier):
+      with open(fichier_metadonnees(fichier)) as f:
+         self.metadonnees=json.load(f)
+      m=self.metadonnees
+      if m['format'] not in FORMATS:
+         raise ValueError('format %r non disponible (%s)'%
+                          (m['format'],', '.join(FORMATS)))
+      self.format=m['format']
+      self.Ts=1.0/m['fe']
+      self.N,self.L,self.Kmax,self.Df=m['N'],m['L'],m['Kmax'],m['Df']
+      if m['nb_echantillons']>0:
+         iq=np.memmap(fichier,dtype=FORMATS[self.format],mode='r')
+      else:
+         # un fichier vide ne peut pas être projeté en mémoire
+         iq=np.zeros(0,dtype=FORMATS[self.format])
+      if len(iq)!=2*m['nb_echantillons']:
+         raise ValueError('%s: %d composantes au lieu de %d'%
+                          (fichier,len(iq),2*m['nb_echantillons']))
+      if self.format=='complex64':
+         self.iq=iq.view('<c8')
+      else:
+         self.iq=np.reshape(iq,(-1,2))
+      self.gain=m['echelle']/PLEINE_ECHELLE
+
+   def __len__(self):
+      return len(self.iq)
+
+   # sorties: échantillons complexes de [debut,fin)
+   def lire(self,debut=0,fin=None):
+      x=self.iq[debut:fin]
+      if self.format=='complex64':
+         return np.asarray(x)
+      y=np.empty(len(x),dtype=np.complex64)
+      y.real=x[:,0]
+      y.imag=x[:,1]
+      y*=self.gain
+      return y
+
+   # sorties (générateur): (debut,bloc) par blocs de taille échantillons,
+   # deux blocs successifs se recouvrant de recouvrement échantillons
+   def blocs(self,taille,recouvrement=0):
+      if taille<=recouvrement:
+         raise ValueError('taille de bloc inférieure au recouvrement')
+      for debut in range(0,max(1,len(self)-recouvrement),taille-recouvrement):
+         yield debut,self.lire(debut,debut+taille)
+
+#####################################################################
+#
+#  Maximum de la métrique temporelle sur une capture, fenêtre par
+#  fenêtre (la métrique complète n'est jamais en mémoire)
+#
+#  entrées:
+#  - capture: CaptureIQ
+#  - nb: nombre de délais (None: toute la capture)
+#  - taille: nombre de délais par fenêtre
+#  - normalisee: voir ofdm_fonctions.metrique_temporelle
+#
+#  sorties:
+#  - theta: délai du maximum de |P|
+#  - P_theta: valeur de la métrique en theta
+#
+####################################################################
+def metrique_temporelle_iq(capture,nb=None,taille=1<<20,normalisee=False):
+   N,L=capture.N,capture.L
+   if nb is None:
+      nb=len(capture)-N-L+1
+   theta,P_theta=0,0.0
+   for d in range(0,nb,taille):
+      nb_fenetre=min(taille,nb-d)
+      P=ofdm.metrique_temporelle(capture.lire(d,d+nb_fenetre+N+L-1),L,N,
+                                 nb_fenetre,normalisee)
+      i=int(np.argmax(np.abs(P)))
+      if np.abs(P[i])>np.abs(P_theta):
+         theta,P_theta=d+i,P[i]
+
+   return theta,P_theta
+
+#####################################################################
+#
+#  Démodulation OFDM d'une capture par paquets de symboles
+#
+#  entrées:
+#  - capture: CaptureIQ
+#  - theta_est: indice du premier échantillon de la trame
+#  - Df_est: décalage en fréquence estimé (Hz)
+#  - T: nombre de symboles OFDM (None: jusqu'à la fin de la capture)
+#  - K: nombre de sous-porteuses (défaut: Kmax+1)
+#  - taille: nombre d'échantillons lus par paquet
+#
+#  sorties (générateur):
+#  - (i,Y[t,K]): indice du premier symbole du paquet et symboles
+#    démodulés, avec la même phase que demodulation_OFDM_trame sur le
+#    signal entier
+#
+####################################################################
+def demodulation_iq(capture,theta_est,Df_est,T=None,K=None,taille=1<<20):
+   N,L,Ts=capture.N,capture.L,capture.Ts
+   if K is None:
+      K=capture.Kmax+1
+   if T is None:
+      T=(len(capture)-theta_est)//(N+L)
+   pas=max(1,taille//(N+L))
+   for i in range(0,T,pas):
+      t=min(pas,T-i)
+      debut=theta_est+i*(N+L)
+      y=capture.lire(debut,debut+t*(N+L))
+      Y=ofdm.demodulation_OFDM_trame(y,0,Df_est,N,L,t,K,Ts)
+      # rotation de phase due à l'indice absolu du début du paquet
+      Y*=np.exp(-1j*2.0*np.pi*Df_est*Ts*debut)
+      yield i,Y
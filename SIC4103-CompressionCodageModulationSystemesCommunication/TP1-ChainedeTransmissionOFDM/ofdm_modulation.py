@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_modulation.py
+# Modulations QPSK/16-QAM/64-QAM à codage de Gray: table de la constellation,
+# modulation des bits, décisions dures et LLR max-log
+import functools
+
+import numpy as np
+
+import ofdm_profil as profil
+
+# ordres de modulation disponibles
+ORDRES=(4,16,64)
+
+#####################################################################
+#
+#  Niveaux de la modulation PAM à codage de Gray d'une dimension
+#  (partie réelle ou imaginaire) de la M-QAM carrée
+#
+#  Le niveau d'indice i vaut (P-1-2*i)/norme, P=sqrt(M), et porte les
+#  bits du code de Gray g=i^(i>>1) (bit de poids fort en premier):
+#  le bit 0 donne un niveau positif, comme pour QPSK_LUT.
+#
+#  entrées:
+#  - M: nombre de points de la constellation (4, 16 ou 64)
+#
+#  sorties:
+#  - niveaux[P]: niveaux normalisés (énergie moyenne par symbole 1)
+#  - bits[h,P]: bits portés par chaque niveau, h=log2(P)
+#  - norme: facteur de normalisation sqrt(2*(M-1)/3)
+#
+####################################################################
+@functools.lru_cache(maxsize=None)
+def niveaux_PAM(M):
+   if M not in ORDRES:
+      raise ValueError('ordre de modulation %r non disponible (%s)'%
+                       (M,', '.join(str(m) for m in ORDRES)))
+   P=int(round(np.sqrt(M)))
+   h=P.bit_length()-1
+   norme=float(np.sqrt(2.0*(M-1)/3.0))
+   i=np.arange(P)
+   niveaux=(P-1-2.0*i)/norme
+   gray=i^(i>>1)
+   bits=((gray>>np.arange(h-1,-1,-1)[:,None])&1).astype(np.uint8)
+   niveaux.flags.writeable=False
+   bits.flags.writeable=False
+
+   return niveaux,bits,norme
+
+#####################################################################
+#
+#  Table de la constellation M-QAM à codage de Gray
+#  (mise en cache pour chaque (M,dtype))
+#
+#  Le symbole d'indice n porte les bits de n (poids fort en premier):
+#  les h premiers bits sur la partie réelle, les h suivants sur la
+#  partie imaginaire. Pour M=4, la table est égale à QPSK_LUT.
+#
+#  entrées:
+#  - M: nombre de points de la constellation (4, 16 ou 64)
+#  - dtype: type des symboles ('complex' ou 'complex64')
+#
+#  sorties:
+#  - table[M]: constellation (lecture seule)
+#
+####################################################################
+def constellation(M,dtype='complex'):
+   return _constellation(int(M),np.dtype(dtype).str)
+
+@functools.lru_cache(maxsize=16)
+def _constellation(M,dtype):
+   niveaux,bits,norme=niveaux_PAM(M)
+   P=len(niveaux)
+   h=bits.shape[0]
+   # indice du niveau portant chaque mot de Gray
+   indice=np.empty(P,dtype=np.intp)
+   indice[(bits*(1<<np.arange(h-1,-1,-1))[:,None]).sum(axis=0)]=np.arange(P)
+   n=np.arange(M)
+   table=(niveaux[indice[n>>h]]+1j*niveaux[indice[n&(P-1)]]).astype(dtype)
+   table.flags.writeable=False
+
+   return table
+
+#####################################################################
+#
+#  Modulation M-QAM de bits
+#
+#  entrées:
+#  - bits[...,n*m]: bits (0 ou 1) dans l'ordre d'émission, m=log2(M)
+#  - M: nombre de points de la constellation
+#  - dtype: type des symboles ('complex' ou 'complex64')
+#
+#  sorties:
+#  - symb[...,n]: symboles
+#
+####################################################################
+@profil.etage()
+def modulation_QAM(bits,M,dtype='complex'):
+   bits=np.asarray(bits)
+   m=int(M).bit_length()-1
+   if bits.shape[-1]%m!=0:
+      raise ValueError('le nombre de bits (%d) doit être un multiple de %d'%
+                       (bits.shape[-1],m))
+   mots=np.reshape(bits,bits.shape[:-1]+(-1,m))
+   indices=mots@(1<<np.arange(m-1,-1,-1))
+
+   return np.take(constellation(M,dtype),indices)
+
+#####################################################################
+#
+#  Indices des niveaux PAM les plus proches d'une dimension x
+#
+####################################################################
+def _indices_PAM(x,M):
+   niveaux,bits,norme=niveaux_PAM(M)
+   P=len(niveaux)
+   i=x*x.dtype.type(-norme/2)
+   i+=(P-1)/2
+   np.rint(i,out=i)
+   np.clip(i,0,P-1,out=i)
+   # indices sur un octet (P<=8): conversion et lectures de table plus rapides
+   return i.astype(np.uint8)
+
+#####################################################################
+#
+#  Décisions dures M-QAM (généralise decision aux QAM carrées)
+#
+#  entrées:
+#  - z[...]: symboles égalisés (énergie moyenne par symbole 1)
+#  - M: nombre de points de la constellation
+#
+#  sorties:
+#  - d[...]: symboles de la constellation les plus proches
+#
+####################################################################
+@profil.etage()
+def decision_QAM(z,M):
+   z=np.asarray(z)
+   niveaux,bits,norme=niveaux_PAM(M)
+   niveaux=niveaux.astype(z.real.dtype)
+   d=np.empty(z.shape,dtype=np.result_type(z.dtype,np.complex64))
+   d.real=np.take(niveaux,_indices_PAM(z.real,M))
+   d.imag=np.take(niveaux,_indices_PAM(z.imag,M))
+
+   return d
+
+#####################################################################
+#
+#  Décisions dures sur les bits
+#
+#  entrées:
+#  - z[...,n]: symboles égalisés (énergie moyenne par symbole 1)
+#  - M: nombre de points de la constellation
+#
+#  sorties:
+#  - bits[...,n*m]: bits décidés (uint8), dans l'ordre de modulation_QAM
+#
+####################################################################
+@profil.etage()
+def decision_bits(z,M):
+   z=np.asarray(z)
+   bits=niveaux_PAM(M)[1]
+   h=bits.shape[0]
+   b=np.empty(z.shape+(2,h),dtype=np.uint8)
+   b[...,0,:]=np.take(bits.T,_indices_PAM(z.real,M),axis=0)
+   b[...,1,:]=np.take(bits.T,_indices_PAM(z.imag,M),axis=0)
+
+   return np.reshape(b,z.shape[:-1]+(-1,))
+
+#####################################################################
+#
+#  Tables du calcul des LLR max-log (mises en cache pour chaque M)
+#
+#  Le LLR max-log d'un bit est une différence de distances quadratiques
+#  à deux niveaux, donc affine en x; les niveaux qui réalisent les minima
+#  ne changent qu'aux multiples entiers de 1/norme. Sur chaque intervalle
+#  [n,n+1]/norme, n=-(P-1)..P-2 (intervalles extrêmes prolongés), le LLR
+#  (à gain/N0 près) vaut donc pente[k,j]*x+origine[k,j], k=n+P-1.
+#
+#  sorties:
+#  - pente[2P-2,h], origine[2P-2,h]: coefficients par intervalle et par bit
+#
+####################################################################
+@functools.lru_cache(maxsize=None)
+def _tables_LLR(M):
+   niveaux,bits,norme=niveaux_PAM(M)
+   h,P=bits.shape
+   n=np.arange(-(P-1),P-1)
+   # LLR exact (recherche sur les P niveaux) en deux points de chaque intervalle
+   x=(n[:,None]+np.array([0.25,0.75]))/norme
+   dist=np.square(x[...,None]-niveaux)
+   llr=np.stack([np.min(dist[...,bits[j]==1],axis=-1)-
+                 np.min(dist[...,bits[j]==0],axis=-1) for j in range(h)],axis=-1)
+   pente=(llr[:,1]-llr[:,0])/(x[:,1]-x[:,0])[:,None]
+   origine=llr[:,0]-pente*x[:,0,None]
+   pente.flags.writeable=False
+   origine.flags.writeable=False
+
+   return pente,origine
+
+#####################################################################
+#
+#  Rapports de log-vraisemblance (LLR) max-log des bits
+#
+#  Pour une QAM carrée à codage de Gray, la métrique se sépare entre
+#  parties réelle et imaginaire: pour chaque bit,
+#     LLR=gain/N0*(min_{b=1}(x-a)^2-min_{b=0}(x-a)^2)
+#  où a parcourt les P niveaux PAM de la dimension portant le bit. Ce LLR
+#  étant affine par morceaux (voir _tables_LLR), il est calculé par deux
+#  lectures de table par bit au lieu d'une recherche sur les P niveaux.
+#  LLR>0 favorise le bit 0 (même convention de signe que decision).
+#
+#  entrées:
+#  - z[...,n]: symboles égalisés, par exemple Y/(sqrt(Es)*H_est)
+#  - M: nombre de points de la constellation
+#  - N0: variance du bruit avant égalisation
+#  - gain[...,n]: gain de l'égaliseur Es*|H_est|^2 (variance du bruit
+#    égalisé N0/gain); 1 pour un canal unitaire
+#
+#  sorties:
+#  - llr[...,n*m]: LLR dans l'ordre de modulation_QAM (réels, de la
+#    précision de z)
+#
+####################################################################
+@profil.etage()
+def llr_maxlog(z,M,N0,gain=1.0):
+   z=np.asarray(z)
+   reel=z.real.dtype
+   norme=niveaux_PAM(M)[2]
+   pente,origine=(t.astype(reel) for t in _tables_LLR(M))
+   P=(len(pente)+2)//2
+   h=pente.shape[1]
+
+   llr=np.empty(z.shape+(2,h),dtype=reel)
+   for d,x in enumerate((z.real,z.imag)):
+      # intervalle de x entre deux multiples de 1/norme
+      k=np.floor(x*reel.type(norme))
+      k+=P-1
+      k=np.clip(k,0,2*P-3,out=k).astype(np.uint8)
+      for j in range(h):
+         llr[...,d,j]=np.take(pente[:,j],k)*x+np.take(origine[:,j],k)
+   llr*=(np.asarray(gain,dtype=reel)/float(N0))[...,None,None]
+
+   return np.reshape(llr,z.shape[:-1]+(-1,))
+
+#####################################################################
+#
+#  Nombre de bits et d'octets portés par les porteuses de données d'une
+#  trame de T symboles OFDM
+#
+#  entrées:
+#  - M: nombre de points de la constellation
+#  - T: nombre de symboles OFDM
+#  - K: nombre de sous-porteuses non-éteintes
+#  - PP: indices des porteuses pilotes
+#
+####################################################################
+def capacite_bits(M,T,K,PP):
+   m=int(M).bit_length()-1
+   return T*(K-len(PP))*m
+
+def capacite_octets(M,T,K,PP):
+   return capacite_bits(M,T,K,PP)//8
+
+#####################################################################
+#
+#  Construction d'une trame OFDM à partir de bits
+#
+#  Les bits sont modulés puis placés sur les porteuses de données,
+#  symbole OFDM par symbole OFDM; les bits manquants en fin de trame
+#  sont mis à 0.
+#
+#  entrées:
+#  - bits[nb_bits]: bits (0 ou 1), au plus capacite_bits
+#  - M: nombre de points de la constellation des porteuses de données
+#  - T: nombre de symboles OFDM
+#  - K: nombre de sous-porteuses non-éteintes
+#  - PP: indices des porteuses pilotes
+#  - pilotes[T,Npp] ou [Npp]: symboles pilotes
+#  - dtype: type des symboles ('complex' ou 'complex64')
+#
+#  sorties:
+#  - X[T,K]: symboles des sous-porteuses non-éteintes
+#
+####################################################################
+@profil.etage()
+def trame_bits(bits,M,T,K,PP,pilotes,dtype='complex'):
+   nb_bits=capacite_bits(M,T,K,PP)
+   if len(bits)>nb_bits:
+      raise ValueError('%d bits ne tiennent pas dans la trame (%d au plus)'%
+                       (len(bits),nb_bits))
+   donnees=np.ones(K,dtype=bool)
+   donnees[PP]=False
+   trame=np.zeros(nb_bits,dtype=np.uint8)
+   trame[0:len(bits)]=bits
+   X=np.empty((T,K),dtype=dtype)
+   X[:,PP]=pilotes
+   X[:,donnees]=np.reshape(modulation_QAM(trame,M,dtype),(T,-1))
+
+   return X
+
+#####################################################################
+#
+#  Construction d'une trame OFDM à partir d'octets (bits de poids fort
+#  en premier, voir trame_bits)
+#
+#  entrées:
+#  - octets[nb_octets]: charge utile (uint8), au plus capacite_octets
+#  - M, T, K, PP, pilotes, dtype: voir trame_bits
+#
+#  sorties:
+#  - X[T,K]: symboles des sous-porteuses non-éteintes
+#
+####################################################################
+def trame_octets(octets,M,T,K,PP,pilotes,dtype='complex'):
+   return trame_bits(np.unpackbits(np.asarray(octets,dtype=np.uint8)),
+                     M,T,K,PP,pilotes,dtype)
+
+#####################################################################
+#
+#  Octets décidés à partir d'une trame OFDM égalisée
+#
+#  entrées:
+#  - Z[T,K]: symboles égalisés des sous-porteuses non-éteintes
+#  - M: nombre de points de la constellation des porteuses de données
+#  - PP: indices des porteuses pilotes
+#  - nb_octets: nombre d'octets de la charge utile
+#
+#  sorties:
+#  - octets_est[nb_octets]: charge utile décidée (uint8)
+#
+####################################################################
+@profil.etage()
+def octets_trame(Z,M,PP,nb_octets):
+   Z=np.atleast_2d(Z)
+   donnees=np.ones(Z.shape[1],dtype=bool)
+   donnees[PP]=False
+   bits=decision_bits(Z[:,donnees],M).ravel()
+
+   return np.packbits(bits[0:8*nb_octets])
+
+# nombre de bits à 1 de chaque octet (numpy<2.0, sans np.bitwise_count)
+POIDS_OCTETS=np.unpackbits(np.arange(256,dtype=np.uint8)[:,None],axis=1).sum(axis=1)
+
+#####################################################################
+#
+#  Nombre d'erreurs binaires entre deux suites d'octets
+#  (ou exclusif puis comptage des bits à 1, par mots de 64 bits)
+#
+####################################################################
+def erreurs_binaires(octets,octets_est):
+   x=np.bitwise_xor(np.asarray(octets,dtype=np.uint8),
+                    np.asarray(octets_est,dtype=np.uint8)).ravel()
+   if not hasattr(np,'bitwise_count'):
+      return int(np.sum(POIDS_OCTETS[x]))
+   n=len(x)//8*8
+   return int(np.sum(np.bitwise_count(x[0:n].view(np.uint64)),dtype=np.int64)+
+              np.sum(np.bitwise_count(x[n:]),dtype=np.int64))
+
+#####################################################################
+#
+#  Nombre de symboles M-QAM erronés entre deux suites d'octets
+#  (symboles de m bits consécutifs, le dernier complété par des 0)
+#
+####################################################################
+def erreurs_symboles(octets,octets_est,M):
+   m=int(M).bit_length()-1
+   x=np.unpackbits(np.bitwise_xor(np.asarray(octets,dtype=np.uint8),
+                                  np.asarray(octets_est,dtype=np.uint8)).ravel())
+   x=np.concatenate((x,np.zeros(-len(x)%m,dtype=np.uint8)))
+
+   return int(np.sum(np.any(np.reshape(x,(-1,m)),axis=1)))
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_pipeline.py
+# Exécution en chaîne de montage (un thread par étage, files bornées entre
+# étages) d'une suite d'étages traitant des blocs: les calculs numpy/FFT
+# libérant le GIL, les étages travaillent en même temps sur des blocs
+# successifs
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+# marque de fin de flux
+FIN=object()
+
+#####################################################################
+#
+#  Étage de la chaîne
+#
+#  entrées:
+#  - nom: nom de l'étage (rapport)
+#  - traiter: fonction bloc -> bloc de sortie (None: rien à transmettre)
+#  - vider: fonction sans argument appelée en fin de flux (None: aucune),
+#    qui renvoie un dernier bloc (ou None)
+#
+#  Mesures: blocs et échantillons (taille des tableaux) reçus, durée de
+#  calcul, attente d'un bloc en entrée (étage affamé) et attente d'une
+#  place dans la file de sortie (étage freiné par le suivant).
+#
+####################################################################
+class Etage:
+   def __init__(self,nom,traiter=None,vider=None):
+      self.nom=nom
+      self.traiter=traiter
+      self.vider=vider
+      self.blocs=0
+      self.echantillons=0
+      self.duree=0.0
+      self.attente_entree=0.0
+      self.attente_sortie=0.0
+
+   # sorties: bloc de sortie (ou None) du traitement d'un bloc
+   def appliquer(self,bloc):
+      self.blocs+=1
+      self.echantillons+=np.size(bloc) if isinstance(bloc,np.ndarray) else 0
+      t0=time.perf_counter()
+      sortie=self.traiter(bloc)
+      self.duree+=time.perf_counter()-t0
+      return sortie
+
+   # sorties: dernier bloc de sortie (ou None) en fin de flux
+   def terminer(self):
+      if self.vider is None:
+         return None
+      t0=time.perf_counter()
+      sortie=self.vider()
+      self.duree+=time.perf_counter()-t0
+      return sortie
+
+   def rapport(self):
+      return dict(nom=self.nom,blocs=self.blocs,echantillons=self.echantillons,
+                  duree=self.duree,attente_entree=self.attente_entree,
+                  attente_sortie=self.attente_sortie,
+                  debit=self.echantillons/self.duree if self.duree>0 else 0.0)
+
+#####################################################################
+#
+#  Exécution de la chaîne source -> étages[0] -> ... -> étages[-1]
+#
+#  Avec fils=True, la source et chaque étage ont leur thread et sont
+#  reliés par des files de taille_file blocs: un étage plus rapide que le
+#  suivant se bloque quand sa file de sortie est pleine, ce qui borne la
+#  mémoire à environ (taille_file+1) blocs par étage. Une exception dans
+#  un étage arrête toute la chaîne et est relancée par le générateur.
+#  Avec fils=False, les étages sont appliqués l'un après l'autre à chaque
+#  bloc dans le thread appelant (même résultat, pour comparaison).
+#
+#  entrées:
+#  - source: itérable de blocs
+#  - etages: liste d'Etage
+#  - taille_file: nombre maximal de blocs en attente entre deux étages
+#  - fils: exécution en chaîne de montage (True) ou séquentielle
+#  - etage_source: Etage recevant les mesures de la source (durée de
+#    production des blocs, attente de place dans la première file)
+#
+#  sorties (générateur):
+#  - blocs de sortie du dernier étage, dans l'ordre
+#
+####################################################################
+def executer(source,etages,taille_file=4,fils=True,etage_source=None):
+   if etage_source is None:
+      etage_source=Etage('source')
+   if not fils:
+      yield from _executer_sequentiel(source,etages,etage_source)
+      return
+
+   files=[queue.Queue(maxsize=taille_file) for e in range(len(etages)+1)]
+   arret=threading.Event()
+   erreurs=[]
+
+   # dépôt dans une file bornée; sorties: durée d'attente
+   def deposer(file,x):
+      t0=time.perf_counter()
+      while not arret.is_set():
+         try:
+            file.put(x,timeout=0.1)
+            break
+         except queue.Full:
+            pass
+      return time.perf_counter()-t0
+
+   # retrait d'une file; sorties: (bloc ou FIN, durée d'attente)
+   def retirer(file):
+      t0=time.perf_counter()
+      while not arret.is_set():
+         try:
+            return file.get(timeout=0.1),time.perf_counter()-t0
+         except queue.Empty:
+            pass
+      return FIN,time.perf_counter()-t0
+
+   def alimenter():
+      try:
+         iterateur=iter(source)
+         while not arret.is_set():
+            t0=time.perf_counter()
+            bloc=next(iterateur,FIN)
+            etage_source.duree+=time.perf_counter()-t0
+            if bloc is FIN:
+               break
+            etage_source.blocs+=1
+            etage_source.echantillons+=np.size(bloc) if isinstance(bloc,np.ndarray) else 0
+            etage_source.attente_sortie+=deposer(files[0],bloc)
+      except BaseException as exc:
+         erreurs.append(exc)
+         arret.set()
+      finally:
+         deposer(files[0],FIN)
+
+   def boucle(etage,entree,sortie):
+      try:
+         while True:
+            bloc,attente=retirer(entree)
+            etage.attente_entree+=attente
+            if bloc is FIN:
+               break
+            resultat=etage.appliquer(bloc)
+            if resultat is not None:
+               etage.attente_sortie+=deposer(sortie,resultat)
+         if not arret.is_set():
+            resultat=etage.terminer()
+            if resultat is not None:
+               etage.attente_sortie+=deposer(sortie,resultat)
+      except BaseException as exc:
+         erreurs.append(exc)
+         arret.set()
+      finally:
+         deposer(sortie,FIN)
+
+   threads=[threading.Thread(target=alimenter,name='source',daemon=True)]
+   for k,etage in enumerate(etages):
+      threads.append(threading.Thread(target=boucle,name=etage.nom,daemon=True,
+                                      args=(etage,files[k],files[k+1])))
+   for t in threads:
+      t.start()
+   try:
+      while True:
+         bloc,attente=retirer(files[-1])
+         if bloc is FIN:
+            break
+         yield bloc
+   finally:
+      # fin du flux, ou arrêt anticipé (exception ou générateur
+      # abandonné): les threads sortent de leurs attentes
+      arret.set()
+      for t in threads:
+         t.join()
+   if erreurs:
+      raise erreurs[0]
+
+def _executer_sequentiel(source,etages,etage_source):
+   iterateur=iter(source)
+   while True:
+      t0=time.perf_counter()
+      bloc=next(iterateur,FIN)
+      etage_source.duree+=time.perf_counter()-t0
+      if bloc is FIN:
+         break
+      etage_source.blocs+=1
+      etage_source.echantillons+=np.size(bloc) if isinstance(bloc,np.ndarray) else 0
+      for etage in etages:
+         bloc=etage.appliquer(bloc)
+         if bloc is None:
+            break
+      else:
+         yield bloc
+   # fin de flux: vidage des étages dans l'ordre
+   for k,etage in enumerate(etages):
+      bloc=etage.terminer()
+      for suivant in etages[k+1:]:
+         if bloc is None:
+            break
+         bloc=suivant.appliquer(bloc)
+      if bloc is not None:
+         yield bloc
+
+#####################################################################
+#
+#  Tableau des mesures par étage
+#
+####################################################################
+def tableau(etages,fichier=sys.stdout):
+   print('%-12s %8s %12s %10s %10s %10s %12s'%('étage','blocs','échant.',
+         'calcul(s)','att.entr.','att.sort.','échant./s'),file=fichier)
+   for etage in etages:
+      r=etage.rapport()
+      print('%-12s %8d %12d %10.3f %10.3f %10.3f %12.3e'%(r['nom'],r['blocs'],
+            r['echantillons'],r['duree'],r['attente_entree'],r['attente_sortie'],
+            r['debit']),file=fichier)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_profil.py
+# Profilage des étages de la chaîne OFDM: nombre d'appels, durée,
+# octets renvoyés, octets alloués (optionnel, par tracemalloc) et
+# échantillons traités par étage, rapport en tableau ou en JSON. Inactif
+# par défaut (activer(), ou variable d'environnement OFDM_PROFIL=1, ou
+# OFDM_PROFIL=memoire pour mesurer aussi les allocations): un étage non
+# mesuré ne coûte qu'un test.
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+_actif=os.environ.get('OFDM_PROFIL','0') not in ('','0')
+_memoire=os.environ.get('OFDM_PROFIL','0')=='memoire'
+_verrou=threading.Lock()
+# nom de l'étage -> [appels, durée (s), octets renvoyés, échantillons,
+# octets alloués]
+_statistiques={}
+# pile (par thread) des mesures d'allocation en cours: [début, pic]
+_cadres=threading.local()
+if _memoire:
+   tracemalloc.start()
+
+# entrées: actif; memoire: mesure aussi des octets alloués (tracemalloc,
+# qui ralentit nettement les allocations)
+def activer(actif=True,memoire=False):
+   global _actif,_memoire
+   _actif=bool(actif)
+   _memoire=_actif and bool(memoire)
+   if _memoire and not tracemalloc.is_tracing():
+      tracemalloc.start()
+
+def actif():
+   return _actif
+
+def memoire():
+   return _memoire
+
+def reinitialiser():
+   with _verrou:
+      _statistiques.clear()
+
+#####################################################################
+#
+#  Taille (éléments, octets) des tableaux numpy d'une valeur (tableau,
+#  ou tuple/liste de tableaux)
+#
+####################################################################
+def _taille(x):
+   if isinstance(x,np.ndarray):
+      return x.size,x.nbytes
+   if isinstance(x,(tuple,list)):
+      elements,octets=0,0
+      for y in x:
+         if isinstance(y,np.ndarray):
+            elements+=y.size
+            octets+=y.nbytes
+      return elements,octets
+   return 0,0
+
+#####################################################################
+#
+#  Octets alloués pendant un appel: pic de la mémoire suivie par
+#  tracemalloc (tableaux numpy compris) au-delà de la mémoire au début de
+#  l'appel, temporaires et sorties comprises. Le pic de tracemalloc étant
+#  global, il est remis à zéro au début de chaque mesure et reporté sur la
+#  mesure englobante (étages imbriqués). Avec plusieurs threads, les
+#  allocations simultanées des autres threads sont aussi comptées.
+#
+####################################################################
+def _debut_allocation():
+   pile=_cadres.__dict__.setdefault('pile',[])
+   courant,pic=tracemalloc.get_traced_memory()
+   if pile:
+      pile[-1][1]=max(pile[-1][1],pic)
+   tracemalloc.reset_peak()
+   pile.append([courant,courant])
+
+def _fin_allocation():
+   pile=_cadres.pile
+   debut,pic=pile.pop()
+   pic=max(pic,tracemalloc.get_traced_memory()[1])
+   if pile:
+      pile[-1][1]=max(pile[-1][1],pic)
+   return pic-debut
+
+#####################################################################
+#
+#  Ajout d'une mesure aux statistiques d'un étage (sûr entre threads)
+#
+####################################################################
+def ajouter(nom,duree,octets=0,echantillons=0,appels=1,alloues=0):
+   with _verrou:
+      s=_statistiques.setdefault(nom,[0,0.0,0,0,0])
+      s[0]+=appels
+      s[1]+=duree
+      s[2]+=octets
+      s[3]+=echantillons
+      s[4]+=alloues
+
+#####################################################################
+#
+#  Décorateur d'un étage de la chaîne
+#
+#  Mesures par appel: durée (inclusive: un étage appelant un autre étage
+#  compte aussi sa durée), octets des tableaux renvoyés (vues et tableaux
+#  en cache compris: ce n'est pas une mesure des allocations), octets
+#  alloués si memoire() (inclusifs eux aussi), et échantillons traités
+#  (taille du premier argument tableau, ou à défaut de la sortie).
+#
+#  entrées:
+#  - nom: nom de l'étage (défaut: nom de la fonction)
+#
+####################################################################
+def etage(nom=None):
+   def decorateur(f):
+      nom_etage=f.__name__ if nom is None else nom
+
+      @functools.wraps(f)
+      def enveloppe(*args,**kwargs):
+         if not _actif:
+            return f(*args,**kwargs)
+         memoire=_memoire
+         if memoire:
+            _debut_allocation()
+         t0=time.perf_counter()
+         try:
+            resultat=f(*args,**kwargs)
+         finally:
+            duree=time.perf_counter()-t0
+            alloues=_fin_allocation() if memoire else 0
+         echantillons,octets=_taille(resultat)
+         for a in args:
+            if isinstance(a,np.ndarray):
+               echantillons=a.size
+               break
+         ajouter(nom_etage,duree,octets,echantillons,alloues=alloues)
+         return resultat
+      return enveloppe
+   return decorateur
+
+#####################################################################
+#
+#  Mesure d'un bloc de code (with profil.mesure('nom',echantillons=n):)
+#
+####################################################################
+class mesure:
+   def __init__(self,nom,echantillons=0,octets=0):
+      self.nom=nom
+      self.echantillons=echantillons
+      self.octets=octets
+
+   def __enter__(self):
+      self.memoire=_actif and _memoire
+      if self.memoire:
+         _debut_allocation()
+      self.t0=time.perf_counter() if _actif else None
+      return self
+
+   def __exit__(self,*exc):
+      if self.t0 is not None:
+         duree=time.perf_counter()-self.t0
+         alloues=_fin_allocation() if self.memoire else 0
+         ajouter(self.nom,duree,self.octets,self.echantillons,alloues=alloues)
+
+#####################################################################
+#
+#  Statistiques courantes et fusion de statistiques (par exemple
+#  renvoyées par des processus de calcul)
+#
+#  sorties:
+#  - dictionnaire nom -> {appels, duree, octets (renvoyés), echantillons,
+#    alloues (octets alloués, 0 si non mesurés)}
+#
+####################################################################
+def statistiques():
+   with _verrou:
+      return {nom:dict(appels=s[0],duree=s[1],octets=s[2],echantillons=s[3],
+                       alloues=s[4])
+              for nom,s in _statistiques.items()}
+
+def fusionner(stats):
+   for nom,s in stats.items():
+      ajouter(nom,s['duree'],s['octets'],s['echantillons'],s['appels'],
+              s.get('alloues',0))
+
+#####################################################################
+#
+#  Rapport: tableau trié par durée décroissante (durées et allocations
+#  inclusives, qui ne s'additionnent pas d'un étage à l'autre), ou
+#  fichier JSON. La colonne des octets alloués n'apparaît que s'ils ont
+#  été mesurés.
+#
+####################################################################
+def tableau(fichier=sys.stdout):
+   stats=statistiques()
+   alloues=any(s['alloues']>0 for s in stats.values())
+   print('%-28s %8s %10s %12s %12s %10s'%('étage','appels','durée(s)',
+         'µs/appel','échant./s','Mo renvoyés')+(' %10s'%'Mo alloués' if alloues else ''),
+         file=fichier)
+   for nom,s in sorted(stats.items(),key=lambda x: -x[1]['duree']):
+      print('%-28s %8d %10.4f %12.1f %12.3e %11.2f'%(nom,s['appels'],s['duree'],
+            1e6*s['duree']/s['appels'],s['echantillons']/max(s['duree'],1e-12),
+            s['octets']/1e6)+(' %10.2f'%(s['alloues']/1e6) if alloues else ''),
+            file=fichier)
+
+def ecrire_json(fichier):
+   with open(fichier,'w') as f:
+      json.dump(statistiques(),f,indent=1)
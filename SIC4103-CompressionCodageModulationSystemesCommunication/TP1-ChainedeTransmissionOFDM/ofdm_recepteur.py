@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_recepteur.py
+# Récepteur OFDM en flux: traite le signal reçu par blocs de taille quelconque
+import numpy as np
+
+import ofdm_fonctions as ofdm
+import ofdm_synchro as synchro
+
+#####################################################################
+#
+#  Récepteur OFDM en flux
+#
+#  Le signal reçu est fourni par blocs successifs (méthode traiter).
+#  Les échantillons d'un symbole OFDM incomplet sont conservés d'un bloc
+#  à l'autre, ainsi que le retard et le décalage fréquentiel estimés:
+#  la mémoire utilisée est bornée par la taille d'un bloc plus N+L.
+#
+#  entrées:
+#  - N: nombre de porteuses total
+#  - L: nombre d'échantillons de l'intervalle de garde
+#  - K: nombre de sous-porteuses non-éteintes
+#  - Ts: période d'échantillonnage (s)
+#  - PP: indices des porteuses pilotes
+#  - pilotes[Npp] ou pilotes[T,Npp]: symboles pilotes connus du récepteur
+#    (la ligne i modulo T est utilisée pour le i-ème symbole OFDM)
+#  - Es: énergie moyenne par symbole
+#  - N0: variance du bruit d'observation
+#  - theta, Df: retard et décalage fréquentiel connus; si None, ils sont
+#    estimés par la métrique temporelle sur les 2N+L-1 premiers échantillons
+#  - preambule: si True, theta et Df (s'ils sont None) sont estimés sur le
+#    symbole de préambule de ofdm_synchro qui précède la trame (recherché
+#    dans le flux; les échantillons antérieurs sont abandonnés)
+#  - coherence: si non None, l'estimée du canal est réutilisée pendant au
+#    plus coherence symboles OFDM (voir egalisation_coherente)
+#  - seuil: seuil du test de dérive sur les pilotes, en multiple de N0
+#  - dtype: précision des calculs ('complex' ou 'complex64'); None: celle
+#    du premier bloc reçu (complex64 au minimum)
+#
+####################################################################
+class RecepteurOFDM:
+   def __init__(self,N,L,K,Ts,PP,pilotes,Es,N0,theta=None,Df=None,
+                coherence=None,seuil=3.0,preambule=False,dtype=None):
+      self.N=N
+      self.L=L
+      self.K=K
+      self.Ts=Ts
+      self.PP=PP
+      self.pilotes=np.atleast_2d(pilotes)
+      self.Es=Es
+      self.N0=N0
+      self.theta_est=theta
+      self.Df_est=Df
+      self.preambule=preambule
+      # précision des calculs (fixée au premier bloc si None)
+      self.dtype=None if dtype is None else np.dtype(dtype)
+      # échantillons reçus non encore consommés
+      self.tampon=np.zeros(0,dtype=self.dtype)
+      # indice absolu du premier échantillon du tampon
+      self.debut=0
+      # indice du prochain symbole OFDM à démoduler
+      self.i=0
+      # réutilisation de l'estimée du canal
+      self.coherence=coherence
+      self.seuil=seuil
+      self.etat_canal=None
+      self.nb_estimations=0
+
+   #################################################################
+   #  Acquisition du retard et du décalage fréquentiel (si nécessaire)
+   #  sorties: True si la synchronisation est disponible
+   #################################################################
+   def synchroniser(self):
+      if self.theta_est is not None and self.Df_est is not None:
+         return True
+      if self.preambule:
+         return self.synchroniser_preambule()
+      if len(self.tampon)<2*self.N+self.L-1:
+         return False
+      P=ofdm.metrique_temporelle(self.tampon,self.L,self.N,self.N)
+      theta=int(np.argmax(np.abs(P)))
+      if self.theta_est is None:
+         self.theta_est=theta
+      if self.Df_est is None:
+         self.Df_est=-np.angle(P[theta])/(2.0*np.pi*self.N*self.Ts)
+      return True
+
+   #################################################################
+   #  Recherche du préambule dans le tampon: le début de la trame
+   #  (indice absolu) suit le préambule; si le préambule n'est pas
+   #  trouvé, seuls les 3(N+L) derniers échantillons sont conservés
+   #################################################################
+   def synchroniser_preambule(self):
+      N,L=self.N,self.L
+      if len(self.tampon)<3*(N+L):
+         return False
+      r=synchro.synchronisation_preambule(self.tampon,N,L,self.K,self.Ts)
+      # le pic du préambule n'est validé qu'avec N+L échantillons après lui
+      if r is not None and r['debut']+3*(N+L)<=len(self.tampon):
+         if self.theta_est is None:
+            self.theta_est=self.debut+r['debut']+N+L
+         if self.Df_est is None:
+            self.Df_est=r['Df']
+         return True
+      if r is not None:
+         pos=r['debut']
+      else:
+         pos=len(self.tampon)-3*(N+L)
+      self.tampon=self.tampon[pos:].copy()
+      self.debut+=pos
+      return False
+
+   #################################################################
+   #  Traitement d'un bloc d'échantillons reçus
+   #
+   #  entrées:
+   #  - bloc: échantillons complexes reçus (taille quelconque), convertis
+   #    dans la précision du récepteur
+   #
+   #  Le bloc est entièrement consommé (tampon, indices et état du canal
+   #  mis à jour) avant le retour.
+   #
+   #  sorties:
+   #  - liste de (i,QPSK_est[K]): indice et décisions de chaque symbole
+   #    OFDM complet (liste vide si aucun)
+   #################################################################
+   def traiter(self,bloc):
+      bloc=np.asarray(bloc)
+      if self.dtype is None:
+         self.dtype=np.result_type(bloc.dtype,np.complex64)
+         self.tampon=self.tampon.astype(self.dtype)
+      self.tampon=np.concatenate((self.tampon,bloc.astype(self.dtype,copy=False)))
+      decisions=[]
+      if not self.synchroniser():
+         return decisions
+
+      N,L=self.N,self.L
+      # position du prochain symbole OFDM dans le tampon
+      pos=self.theta_est+self.i*(N+L)-self.debut
+      T=(len(self.tampon)-pos)//(N+L)
+      if T>0:
+         Y=ofdm.demodulation_OFDM_trame(self.tampon,pos,self.Df_est,N,L,T,
+                                        self.K,self.Ts)
+         # rotation de phase due à l'indice absolu du début du tampon
+         Y*=np.exp(-1j*2.0*np.pi*self.Df_est*self.Ts*self.debut)
+         pilotes=self.pilotes[(self.i+np.arange(T))%len(self.pilotes)]
+         if self.coherence is None:
+            # estimation du canal des T symboles OFDM en un seul passage
+            H_est=ofdm.estimation_canal_cache(Y,pilotes,self.PP,self.Es,self.N0)
+            QPSK_est=ofdm.decision(Y/H_est/float(self.Es)**0.5)
+            self.nb_estimations+=T
+         else:
+            QPSK_est,self.etat_canal,nb=ofdm.egalisation_coherente(Y,pilotes,
+               self.PP,self.Es,self.N0,self.coherence,self.seuil,self.etat_canal)
+            self.nb_estimations+=nb
+         decisions=[(self.i+t,QPSK_est[t]) for t in range(T)]
+         self.i+=T
+         pos+=T*(N+L)
+
+      # ne conserver que les échantillons du symbole OFDM incomplet
+      pos=min(pos,len(self.tampon))
+      self.tampon=self.tampon[pos:].copy()
+      self.debut+=pos
+
+      return decisions
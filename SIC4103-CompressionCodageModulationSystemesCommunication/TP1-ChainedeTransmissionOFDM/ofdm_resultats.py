@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_resultats.py
+# Base persistante des résultats de simulation (SQLite): une ligne par
+# réalisation, indexée par l'empreinte des paramètres complets de la
+# chaîne, pour reprendre, compléter et fusionner des balayages
+import hashlib
+import json
+import sqlite3
+
+import numpy as np
+
+# version de la chaîne simulée, incluse dans l'empreinte: à incrémenter
+# quand une modification change les résultats à paramètres égaux
+VERSION=1
+
+SCHEMA='''
+create table if not exists points(
+   cle text primary key,
+   parametres text not null);
+create table if not exists realisations(
+   cle text not null,
+   realisation integer not null,
+   erreurs_bits integer not null,
+   bits integer not null,
+   erreurs_symboles integer not null,
+   symboles integer not null,
+   duree real not null,
+   primary key(cle,realisation));
+'''
+
+# paramètres réels: 10 et 10.0 (API / ligne de commande) donnent la même clé
+REELS=('EsN0dB','Tm','Df','fD','Es')
+
+def _json(x):
+   # types numpy (np.float64, np.int64, tableaux) vers types JSON
+   if isinstance(x,np.generic):
+      return x.item()
+   if isinstance(x,np.ndarray):
+      return x.tolist()
+   raise TypeError('%r non sérialisable'%(x,))
+
+#####################################################################
+#
+#  Empreinte d'un jeu de paramètres
+#
+#  Les paramètres (et les options de tirage, par exemple la graine) sont
+#  écrits en JSON canonique (clés triées) avec VERSION, puis hachés en
+#  SHA-256: deux points de balayage ont la même clé si et seulement si
+#  leurs paramètres sont identiques, indépendamment de leur position
+#  dans la grille. Les paramètres de REELS sont convertis en float
+#  (None conservé) avant l'écriture.
+#
+#  entrées:
+#  - p: dictionnaire des paramètres (parametres_OFDM + EsN0dB, mode, ...)
+#  - options: autres champs à inclure (graine, ...)
+#
+#  sorties:
+#  - clé hexadécimale (64 caractères)
+#
+####################################################################
+def description(p,**options):
+   p=dict(p,version=VERSION,**options)
+   for nom in REELS:
+      if p.get(nom) is not None:
+         p[nom]=float(p[nom])
+   return json.dumps(p,sort_keys=True,separators=(',',':'),default=_json)
+
+def cle_parametres(p,**options):
+   return hashlib.sha256(description(p,**options).encode()).hexdigest()
+
+#####################################################################
+#
+#  Base de résultats SQLite
+#
+#  Une réalisation est identifiée par (clé, indice): elle est
+#  déterministe (graine dérivée de la clé et de l'indice), donc
+#  l'enregistrer deux fois ne change rien (insert or ignore), et des
+#  bases calculées sur plusieurs machines se fusionnent sans double
+#  comptage. Le journal WAL et le délai d'attente des verrous permettent
+#  à plusieurs processus d'écrire dans le même fichier (local): chaque
+#  écriture est une transaction courte.
+#
+#  entrées:
+#  - chemin: fichier SQLite (créé si nécessaire)
+#  - delai: attente maximale d'un verrou (s)
+#
+####################################################################
+class BaseResultats:
+   def __init__(self,chemin,delai=60.0):
+      self.chemin=chemin
+      self.connexion=sqlite3.connect(chemin,timeout=delai)
+      self.connexion.execute('pragma journal_mode=wal')
+      with self.connexion:
+         self.connexion.executescript(SCHEMA)
+
+   # entrées: clé et paramètres d'un point (table de correspondance)
+   def declarer(self,cle,p,**options):
+      with self.connexion:
+         self.connexion.execute('insert or ignore into points values (?,?)',
+                                (cle,description(p,**options)))
+
+   # entrées: liste de (cle,indice,(erreurs_bits,bits,erreurs_symboles,
+   # symboles,duree)), écrites en une transaction
+   def enregistrer(self,lignes):
+      with self.connexion:
+         self.connexion.executemany(
+            'insert or ignore into realisations values (?,?,?,?,?,?,?)',
+            [(cle,int(r))+tuple(res) for cle,r,res in lignes])
+
+   # sorties: dictionnaire {indice: (erreurs_bits,bits,erreurs_symboles,
+   # symboles,duree)} des réalisations enregistrées pour la clé
+   def realisations(self,cle):
+      lignes=self.connexion.execute(
+         'select realisation,erreurs_bits,bits,erreurs_symboles,symboles,'
+         'duree from realisations where cle=?',(cle,))
+      return {l[0]:l[1:] for l in lignes}
+
+   # sorties: paramètres (dictionnaire) d'une clé déclarée, ou None
+   def parametres(self,cle):
+      l=self.connexion.execute('select parametres from points where cle=?',
+                               (cle,)).fetchone()
+      return None if l is None else json.loads(l[0])
+
+   # fusion d'une autre base (par exemple calculée sur une autre machine)
+   # sorties: nombre de réalisations ajoutées
+   def fusionner(self,chemin):
+      avant=self.connexion.total_changes
+      self.connexion.execute('attach database ? as autre',(chemin,))
+      try:
+         with self.connexion:
+            self.connexion.execute(
+               'insert or ignore into points select * from autre.points')
+            self.connexion.execute(
+               'insert or ignore into realisations select * from autre.realisations')
+      finally:
+         self.connexion.execute('detach database autre')
+      return self.connexion.total_changes-avant
+
+   def fermer(self):
+      self.connexion.close()
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self,*exc):
+      self.fermer()
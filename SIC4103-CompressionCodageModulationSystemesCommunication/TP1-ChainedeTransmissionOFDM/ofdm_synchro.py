@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: ofdm_synchro.py
+# Synchronisation temporelle et fréquentielle sur un symbole OFDM de
+# préambule connu (intercorrélation par FFT sur de longs signaux reçus)
+import functools
+
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_fonctions as ofdm
+import ofdm_profil as profil
+
+# graine de la suite QPSK du préambule (connue de l'émetteur et du récepteur)
+GRAINE_PREAMBULE=0x5EC
+
+#####################################################################
+#
+#  Symbole OFDM de préambule (mis en cache pour chaque (N,L,K,dtype))
+#
+#  Les K sous-porteuses non-éteintes portent une suite QPSK fixe; le
+#  symbole est obtenu par modulation_OFDM (retard fractionnaire nul).
+#
+#  entrées:
+#  - N: nombre de porteuses total
+#  - L: nombre d'échantillons de l'intervalle de garde
+#  - K: nombre de sous-porteuses non-éteintes
+#  - dtype: type des échantillons ('complex' ou 'complex64')
+#
+#  sorties:
+#  - QPSK[K]: symboles du préambule (lecture seule)
+#  - s[N+L]: symbole OFDM avec intervalle de garde (lecture seule)
+#
+####################################################################
+def preambule(N,L,K,dtype='complex'):
+   return _preambule(int(N),int(L),int(K),np.dtype(dtype).str)
+
+@functools.lru_cache(maxsize=8)
+def _preambule(N,L,K,dtype):
+   QPSK=ofdm.gen_QPSK(K,np.random.default_rng(GRAINE_PREAMBULE))
+   s=ofdm.modulation_OFDM(QPSK,N,L,0.0).astype(dtype)
+   QPSK=QPSK.astype(dtype)
+   QPSK.flags.writeable=False
+   s.flags.writeable=False
+
+   return QPSK,s
+
+#####################################################################
+#
+#  Filtres de corrélation des segments de la partie utile du préambule
+#  (mis en cache)
+#
+#  sorties:
+#  - C[S,B]: réponses fréquentielles des filtres conj(p_s[::-1])
+#  - Ep[S]: énergie de chaque segment
+#
+####################################################################
+@functools.lru_cache(maxsize=8)
+def _filtres_preambule(N,L,K,S,B,dtype):
+   p=np.reshape(preambule(N,L,K,dtype)[1][L:],(S,N//S))
+   C=np.fft.fft(np.conj(p[:,::-1]),B,axis=-1).astype(dtype)
+   Ep=np.sum(np.abs(p)**2,axis=-1)
+   C.flags.writeable=False
+
+   return C,Ep
+
+#####################################################################
+#
+#  Métrique de détection du préambule
+#
+#  La partie utile du préambule est découpée en S segments de N/S
+#  échantillons, corrélés séparément (overlap-save, tous les segments en
+#  un seul passage) puis combinés en puissance: un décalage en fréquence
+#  de moins de S/2 espacements entre sous-porteuses ne détruit pas la
+#  corrélation. La métrique est normalisée par l'inégalité de
+#  Cauchy-Schwarz:
+#     rho[n]=somme_s |d_s[n+s*N/S]|^2 / somme_s E_s[n]*Ep_s
+#  où E_s[n] est l'énergie reçue sous le segment s. rho vaut 1 pour le
+#  préambule seul sans bruit ni canal, et environ S/N loin du préambule.
+#
+#  entrées:
+#  - y: échantillons reçus
+#  - N, L, K: paramètres OFDM
+#  - S: nombre de segments (diviseur de N)
+#
+#  sorties:
+#  - rho[len(y)-N+1]: métrique pour un début de partie utile en n
+#  - num[len(y)-N+1]: numérateur de rho (énergie de corrélation, non
+#    normalisée)
+#
+####################################################################
+@profil.etage()
+def metrique_preambule(y,N,L,K,S=8):
+   y=np.asarray(y)
+   dtype=np.result_type(y.dtype,np.complex64)
+   Ns=N//S
+   B=canal.taille_bloc(Ns)
+   C,Ep=_filtres_preambule(N,L,K,S,B,np.dtype(dtype).str)
+   nb=len(y)-N+1
+   if nb<=0:
+      return np.zeros(0),np.zeros(0)
+   d=canal.overlap_save(y.astype(dtype,copy=False),C,Ns,B)
+
+   # énergie reçue sur les fenêtres de Ns échantillons
+   ce=np.concatenate((np.zeros(1),np.cumsum(np.abs(y)**2,dtype=np.float64)))
+   E=ce[Ns:]-ce[:-Ns]
+   num=np.zeros(nb)
+   den=np.zeros(nb)
+   for s in range(S):
+      num+=np.abs(d[s,s*Ns:s*Ns+nb])**2
+      den+=E[s*Ns:s*Ns+nb]*Ep[s]
+   rho=np.divide(num,den,out=np.zeros(nb),where=den>0)
+
+   return rho,num
+
+#####################################################################
+#
+#  Détection du préambule et estimation du décalage en fréquence
+#
+#  Le signal est parcouru par fenêtres de taille bornée (recouvrement de
+#  N+L échantillons); la recherche s'arrête à la première fenêtre où la
+#  métrique dépasse le seuil. Sur un canal à trajets multiples, rho au
+#  maximum vaut environ la part d'énergie du trajet le plus fort: le
+#  seuil par défaut (0.05) reste loin du plancher S/N de la métrique hors
+#  préambule.
+#  Décalage en fréquence Df=(q+eps)/(N*Ts):
+#  - eps (fraction d'espacement, |eps|<1/2): phase de la corrélation de
+#    la seconde moitié de l'intervalle de garde avec la fin du préambule
+#  - q (entier): corrélation, dans le domaine fréquentiel, des produits
+#    Y[k]*conj(Y[k+1]) du préambule reçu (après correction de eps) avec
+#    ceux du préambule connu, pour les décalages |q|<=q_max (un seul
+#    passage de FFT); ces produits sont insensibles au canal lorsque les
+#    sous-porteuses voisines voient le même gain
+#
+#  entrées:
+#  - y: échantillons reçus
+#  - N, L, K: paramètres OFDM
+#  - Ts: période d'échantillonnage (s)
+#  - seuil: seuil de détection sur rho (entre 0 et 1)
+#  - S: nombre de segments de la corrélation
+#  - q_max: décalage entier maximal recherché (défaut: S//2)
+#  - fenetre: nombre d'échantillons traités par fenêtre
+#
+#  sorties:
+#  - None si le préambule n'est pas détecté, sinon dictionnaire:
+#    debut (indice du premier échantillon du préambule, intervalle de
+#    garde compris; la trame suit en debut+N+L), Df_entier, Df_frac,
+#    Df=Df_entier+Df_frac (Hz) et confiance (rho au pic)
+#
+####################################################################
+@profil.etage()
+def synchronisation_preambule(y,N,L,K,Ts,seuil=0.05,S=8,q_max=None,fenetre=1<<18):
+   y=np.asarray(y)
+   if q_max is None:
+      q_max=S//2
+   fenetre=max(fenetre,4*(N+L))
+   n0=None
+   for a in range(0,max(1,len(y)-N-L+1),fenetre):
+      rho=metrique_preambule(y[a:a+fenetre+N+L],N,L,K,S)[0]
+      # début de la partie utile au moins L échantillons après a
+      if a==0:
+         rho[0:L]=0
+      au_dessus=np.flatnonzero(rho[0:fenetre+L]>seuil)
+      if len(au_dessus)>0:
+         n0=a+int(au_dessus[0])
+         break
+   if n0 is None:
+      return None
+   # le dernier segment (recopié dans l'intervalle de garde) donne un pic
+   # secondaire N échantillons avant le vrai, aussi haut que lui en rho si
+   # le signal commence par du silence: le maximum m est cherché sur
+   # [n0,n0+N+L] avec l'énergie de corrélation non normalisée (S fois plus
+   # grande au vrai pic). Premier trajet: premier échantillon de [m-L,m]
+   # au-delà du quart de ce maximum (un début tardif créerait de
+   # l'interférence entre symboles, un début précoce reste dans
+   # l'intervalle de garde).
+   a=max(L,n0-L)
+   rho,num=metrique_preambule(y[a:n0+2*N+2*L],N,L,K,S)
+   m=n0-a+int(np.argmax(num[n0-a:n0-a+N+L+1]))
+   confiance=float(rho[m])
+   b=max(0,m-L)
+   n=a+b+int(np.argmax(num[b:m+1]>=0.25*num[m]))
+   if n+N>len(y):
+      return None
+   debut=n-L
+
+   # fraction d'espacement: seconde moitié de l'intervalle de garde
+   r=y[debut+L//2:debut+L]*np.conj(y[debut+L//2+N:debut+L+N])
+   eps=-np.angle(np.sum(r))/(2.0*np.pi)
+
+   # décalage entier: partie utile corrigée de eps, puis FFT
+   QPSK,s=preambule(N,L,K,y.dtype)
+   z=y[n:n+N]*np.exp(-1j*2.0*np.pi*eps*np.arange(N)/N)
+   Y=np.fft.fft(z)
+   A=Y*np.conj(np.roll(Y,-1))
+   P=np.zeros(N,dtype=complex)
+   P[0:K-1]=QPSK[0:K-1]*np.conj(QPSK[1:K])
+   # R[q]=somme_k A[k+q]*conj(P[k]) pour tous les q (corrélation circulaire)
+   R=np.fft.ifft(np.fft.fft(A)*np.conj(np.fft.fft(P)))
+   q=np.arange(-q_max,q_max+1)
+   q=int(q[np.argmax(np.abs(R[q]))])
+
+   return dict(debut=debut,Df_entier=q/(N*Ts),Df_frac=eps/(N*Ts),
+               Df=(q+eps)/(N*Ts),confiance=confiance)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: rejeu_iq.py
+# Ce script enregistre le signal reçu d'une trame OFDM (préambule, canal,
+# bruit) dans une capture IQ, puis rejoue une capture à travers le
+# récepteur en flux, lue par blocs depuis le disque, et affiche le TES
+#
+# exemples:
+#   python rejeu_iq.py enregistrer capture.iq --EsN0dB 15 --format int16
+#   python rejeu_iq.py rejouer capture.iq
+import argparse
+import time
+
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_fonctions as ofdm
+import ofdm_iq as iq
+import ofdm_synchro as synchro
+from ofdm_balayage import parametres_OFDM
+from ofdm_recepteur import RecepteurOFDM
+
+parser=argparse.ArgumentParser(description='Enregistrement et rejeu de captures IQ OFDM')
+parser.add_argument('action',choices=['enregistrer','rejouer'])
+parser.add_argument('capture')
+parser.add_argument('--format',default='complex64',choices=list(iq.FORMATS))
+parser.add_argument('--EsN0dB',type=float,default=20)
+parser.add_argument('--mode',type=int,default=1)
+parser.add_argument('--Tm',type=float,default=10)
+parser.add_argument('--T',type=int,default=10)
+# échantillons de bruit seul avant la trame
+parser.add_argument('--silence',type=int,default=1<<20)
+parser.add_argument('--graine',type=int,default=0)
+# taille des blocs lus et écrits (échantillons)
+parser.add_argument('--bloc',type=int,default=1<<18)
+args=parser.parse_args()
+
+p=parametres_OFDM()
+N,L,Ts,Es=p['N'],p['L'],p['Ts'],p['Es']
+K=p['Kmax']-p['Kmin']+1
+PP=np.arange(0,K,p['pas_pilotes'])
+
+# symboles QPSK de la trame (pilotes compris), retrouvés au rejeu par la graine
+def symboles(graine,T):
+    return np.reshape(ofdm.gen_QPSK(T*K,np.random.default_rng(graine)),(T,K))
+
+if args.action=='enregistrer':
+    rng=np.random.default_rng(args.graine+1)
+    N0=Es/np.power(10,args.EsN0dB/10)
+    X=symboles(args.graine,args.T)
+    s=np.concatenate((np.zeros(args.silence),synchro.preambule(N,L,K)[1],
+                      ofdm.modulation_OFDM_trame(Es**0.5*X,N,L,p['e']).ravel()))
+    s=ofdm.decalage_frequence(s,p['Df'],Ts,N+L)
+    # canal et bruit appliqués bloc par bloc avant écriture
+    c=ofdm.reponse_canal(L,args.mode,args.Tm,rng)
+    filtre=canal.ConvolutionFlux(c)
+    # pleine échelle int16: 4 écarts types (par composante) du signal reçu
+    puissance=np.mean(np.abs(s[args.silence:])**2)*np.sum(np.abs(c)**2)+N0
+    echelle=4*np.sqrt(puissance/2)
+    with iq.EnregistreurIQ(args.capture,Ts,N,L,p['Kmax'],p['Df'],args.format,
+                           echelle,graine=args.graine,T=args.T,EsN0dB=args.EsN0dB,
+                           theta=args.silence+N+L) as e:
+        for debut in range(0,len(s),args.bloc):
+            y=filtre.filtrer(s[debut:debut+args.bloc])
+            e.ecrire(y+ofdm.bruit_BABG(len(y),N0,rng))
+    print(e.metadonnees)
+else:
+    capture=iq.CaptureIQ(args.capture)
+    m=capture.metadonnees
+    X=symboles(m['graine'],m['T'])
+    N0=Es/np.power(10,m['EsN0dB']/10)
+    recepteur=RecepteurOFDM(capture.N,capture.L,capture.Kmax+1,capture.Ts,PP,
+                            X[:,PP],Es,N0,preambule=True)
+    erreurs=0
+    nb=0
+    t0=time.perf_counter()
+    for debut,bloc in capture.blocs(args.bloc):
+        for i,QPSK_est in recepteur.traiter(bloc):
+            if i<len(X):
+                # décisions dans la précision de la capture (complex64)
+                erreurs+=ofdm.erreurs_QPSK(QPSK_est,X[i])
+                nb+=K
+    duree=time.perf_counter()-t0
+    print('échantillons= ',len(capture),' débit (échantillons/s)= ',len(capture)/duree)
+    print('retard estimé= ',recepteur.theta_est,' (enregistré: ',m['theta'],')')
+    print('Df estimé= ',recepteur.Df_est,' (enregistré: ',capture.Df,')')
+    print('symboles= ',nb,' erreurs= ',erreurs,' TES= ',erreurs/max(1,nb))
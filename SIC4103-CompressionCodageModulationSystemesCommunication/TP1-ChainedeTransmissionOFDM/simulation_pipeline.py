@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: simulation_pipeline.py
+# Ce script simule un long flux OFDM (préambule puis symboles QPSK) en
+# chaîne de montage: modulation, canal (décalage en fréquence et
+# convolution en flux), bruit et récepteur en flux sont des étages reliés
+# par des files bornées de blocs de symboles OFDM, chacun dans son thread.
+# Il affiche le TES, le débit de chaque étage et la durée comparée à
+# l'exécution séquentielle des mêmes étages.
+#
+# exemple: python simulation_pipeline.py --symboles 2000 --bloc 16 --file 4
+import argparse
+import time
+
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_fonctions as ofdm
+import ofdm_pipeline as pipeline
+import ofdm_synchro as synchro
+from ofdm_balayage import parametres_OFDM
+from ofdm_recepteur import RecepteurOFDM
+
+parser=argparse.ArgumentParser(description='Simulation OFDM en chaîne de montage')
+parser.add_argument('--EsN0dB',type=float,default=20)
+parser.add_argument('--mode',type=int,default=1)
+parser.add_argument('--Tm',type=float,default=10)
+# fréquence Doppler maximale du canal de Rayleigh (Hz, 0: canal fixe) et
+# nombre d'échantillons par valeur du canal
+parser.add_argument('--doppler',type=float,default=0.0)
+parser.add_argument('--pas-doppler',type=int,default=None)
+# nombre total de symboles OFDM et nombre de symboles par bloc
+parser.add_argument('--symboles',type=int,default=2000)
+parser.add_argument('--bloc',type=int,default=16)
+# nombre maximal de blocs en attente entre deux étages
+parser.add_argument('--file',type=int,default=4)
+parser.add_argument('--graine',type=int,default=0)
+# exécution en chaîne de montage seulement (pas de comparaison)
+parser.add_argument('--sans-sequentiel',action='store_true')
+args=parser.parse_args()
+
+p=parametres_OFDM()
+N,L,Ts,Es,Df=p['N'],p['L'],p['Ts'],p['Es'],p['Df']
+K=p['Kmax']-p['Kmin']+1
+PP=np.arange(0,K,p['pas_pilotes'])
+N0=Es/np.power(10,args.EsN0dB/10)
+# pilotes connus du récepteur (suite de période 16 symboles OFDM)
+pilotes=np.reshape(ofdm.gen_QPSK(16*len(PP),np.random.default_rng(args.graine)),(16,len(PP)))
+
+# symboles émis par blocs (la même suite est régénérée pour le comptage)
+def symboles(graine):
+    rng=np.random.default_rng([graine,1])
+    for i in range(0,args.symboles,args.bloc):
+        X=np.reshape(ofdm.gen_QPSK(min(args.bloc,args.symboles-i)*K,rng),(-1,K))
+        X[:,PP]=pilotes[(i+np.arange(len(X)))%len(pilotes)]
+        yield X
+
+#####################################################################
+# Étages de la chaîne (l'état de chaque étage lui est propre)
+#####################################################################
+def etages(graine):
+    rng=np.random.default_rng([graine,2])
+    etat=dict(n=0,premier=True)
+    # canal: décalage en fréquence (phase continue d'un bloc à l'autre)
+    # puis convolution en flux, par un canal fixe ou à effet Doppler
+    if args.mode==1 and args.doppler>0:
+        filtre=canal.CanalDoppler(L,args.Tm,args.doppler,Ts,
+            pas=p['pas_doppler'] if args.pas_doppler is None else args.pas_doppler,
+            rng=rng)
+    else:
+        filtre=canal.ConvolutionFlux(ofdm.reponse_canal(L,args.mode,args.Tm,rng))
+    recepteur=RecepteurOFDM(N,L,K,Ts,PP,pilotes,Es,N0,preambule=True)
+
+    def modulation(X):
+        s=ofdm.modulation_OFDM_trame(Es**0.5*X,N,L,p['e']).ravel()
+        if etat['premier']:
+            # retard et préambule devant le premier bloc
+            etat['premier']=False
+            s=np.concatenate((np.zeros(p['theta']),Es**0.5*synchro.preambule(N,L,K)[1],s))
+        return s
+
+    def decaler(s):
+        s=ofdm.decalage_frequence(s,Df,Ts,N+L)
+        s*=np.exp(1j*2.0*np.pi*Df*Ts*etat['n'])
+        etat['n']+=len(s)
+        return s
+
+    def bruiter(y):
+        y+=ofdm.bruit_BABG(len(y),N0,rng)
+        return y
+
+    def recevoir(y):
+        decisions=recepteur.traiter(y)
+        return decisions if decisions else None
+
+    return [pipeline.Etage('modulation',modulation),
+            pipeline.Etage('canal',lambda s: filtre.filtrer(decaler(s)),
+                           filtre.vider),
+            pipeline.Etage('bruit',bruiter),
+            pipeline.Etage('reception',recevoir)]
+
+def simuler(fils):
+    liste=etages(args.graine)
+    source=pipeline.Etage('source')
+    reference=(x for X in symboles(args.graine) for x in X)
+    erreurs=0
+    nb=0
+    t0=time.perf_counter()
+    for decisions in pipeline.executer(symboles(args.graine),liste,args.file,
+                                       fils,source):
+        for i,QPSK_est in decisions:
+            erreurs+=ofdm.erreurs_QPSK(QPSK_est,next(reference))
+            nb+=K
+    return time.perf_counter()-t0,[source]+liste,erreurs,nb
+
+duree,liste,erreurs,nb=simuler(True)
+# débit global: échantillons temporels entrant dans le canal
+print('chaîne de montage: %.3f s, %.3e échantillons/s'%(duree,liste[2].echantillons/duree))
+pipeline.tableau(liste)
+print('symboles= ',nb,' erreurs= ',erreurs,' TES= ',erreurs/max(1,nb))
+if not args.sans_sequentiel:
+    duree_seq,liste,erreurs_seq,nb_seq=simuler(False)
+    print('séquentiel: %.3f s (accélération x%.2f)'%(duree_seq,duree_seq/duree))
+    pipeline.tableau(liste)
+    if (erreurs_seq,nb_seq)!=(erreurs,nb):
+        print('attention: résultats différents en séquentiel: ',erreurs_seq,nb_seq)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: transmission_fichier.py
+# Ce script transmet le contenu d'un fichier par la chaîne OFDM, trame par
+# trame (une réalisation du canal par trame), écrit le fichier reçu et
+# affiche le TEB de la charge utile
+#
+# exemple: python transmission_fichier.py simu.py --sortie recu.py --EsN0dB 20 --M 16 --rendement 1/2
+import argparse
+import time
+
+import numpy as np
+
+import ofdm_codage as codage
+import ofdm_modulation as modulation
+import ofdm_profil as profil
+from ofdm_balayage import capacite,parametres_OFDM,transmission
+
+parser=argparse.ArgumentParser(description='Transmission d\'un fichier par la chaîne OFDM')
+parser.add_argument('fichier')
+parser.add_argument('--sortie',default=None)
+parser.add_argument('--EsN0dB',type=float,default=20)
+parser.add_argument('--mode',type=int,default=1)
+parser.add_argument('--Tm',type=float,default=10)
+# fréquence Doppler maximale du canal de Rayleigh (Hz)
+parser.add_argument('--doppler',type=float,default=0.0)
+parser.add_argument('--synchro',default='ideale',choices=['ideale','metrique','preambule'])
+parser.add_argument('--M',type=int,default=4,choices=list(modulation.ORDRES))
+parser.add_argument('--rendement',default=None,choices=list(codage.POINCONNAGE))
+parser.add_argument('--decodage',default='souple',choices=['souple','dur'])
+parser.add_argument('--T',type=int,default=10)
+parser.add_argument('--graine',type=int,default=0)
+# profilage des étages de la chaîne (avec les octets alloués par étage)
+parser.add_argument('--profil',action='store_true')
+parser.add_argument('--profil-memoire',action='store_true')
+args=parser.parse_args()
+
+p=parametres_OFDM()
+p.update(EsN0dB=args.EsN0dB,mode=args.mode,Tm=args.Tm,synchro=args.synchro,
+         M=args.M,rendement=args.rendement,decodage=args.decodage,T=args.T,
+         fD=args.doppler)
+# octets par trame
+nb_octets=capacite(p)
+
+# charge utile: octets du fichier, sans conversion
+octets=np.fromfile(args.fichier,dtype=np.uint8)
+octets_est=np.empty_like(octets)
+rng=np.random.default_rng(args.graine)
+profil.activer(args.profil or args.profil_memoire,args.profil_memoire)
+t0=time.perf_counter()
+for debut in range(0,len(octets),nb_octets):
+    trame=octets[debut:debut+nb_octets]
+    octets_est[debut:debut+len(trame)]=transmission(p,trame,rng)
+duree=time.perf_counter()-t0
+
+nb_err=modulation.erreurs_binaires(octets,octets_est)
+print('octets= ',len(octets),' trames= ',-(-len(octets)//nb_octets))
+print('erreurs binaires= ',nb_err,' TEB= ',nb_err/max(1,8*len(octets)))
+print('octets erronés= ',int(np.sum(octets!=octets_est)))
+print('débit simulé (octets/s)= ',len(octets)/duree)
+if args.sortie is not None:
+    octets_est.tofile(args.sortie)
+if profil.actif():
+    profil.tableau()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: verification_complex64.py
+# Ce script vérifie que la chaîne OFDM en simple précision (complex64) ne
+# promeut aucun tableau en double précision et donne le même TEB que la
+# chaîne en double précision (complex128) aux points de fonctionnement
+import os
+import tempfile
+
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_fonctions as ofdm
+import ofdm_iq as iq
+import ofdm_synchro as synchro_preambule
+from ofdm_balayage import parametres_OFDM
+from ofdm_recepteur import RecepteurOFDM
+
+################################################################################
+# Définition des paramètres
+################################################################################
+p=parametres_OFDM()
+N,L,Ts,T,Es,theta,Df,e=p['N'],p['L'],p['Ts'],p['T'],p['Es'],p['theta'],p['Df'],p['e']
+K=p['Kmax']-p['Kmin']+1
+PP=np.arange(0,K,p['pas_pilotes'])
+# étalement temporel du canal (échantillons)
+Tm=10
+# points de fonctionnement (dB)
+EsN0dB_liste=[10,15,20]
+# nombre de réalisations par point
+nb_realisations=20
+
+#####################################################################
+#  Chaîne complète (émission -> canal -> réception) dans la précision
+#  des symboles QPSK, du canal et du bruit fournis; vérifie le type de
+#  chaque étage
+#####################################################################
+def chaine(QPSK,c,bruit,N0,synchro):
+    dtype=QPSK.dtype
+    etages={}
+    s=ofdm.modulation_OFDM_trame(Es**0.5*QPSK,N,L,e).ravel()
+    etages['modulation']=s
+    s=np.concatenate((np.zeros(theta,dtype=dtype),s))
+    s=ofdm.decalage_frequence(s,Df,Ts,N+L)
+    y=canal.convolution_canal(s,c)
+    etages['convolution']=y
+    y+=bruit[0:len(y)]
+    if synchro:
+        P=ofdm.metrique_temporelle(y,L,N,N)
+        etages['metrique']=P
+        theta_est=int(np.argmax(np.abs(P)))
+        Df_est=-np.angle(P[theta_est])/(2.0*np.pi*N*Ts)
+    else:
+        theta_est,Df_est=theta,Df
+    Y=ofdm.demodulation_OFDM_trame(y,theta_est,Df_est,N,L,T,K,Ts)
+    etages['FFT']=Y
+    for nom,estimateur in [('estimation_cache',ofdm.estimation_canal_cache),
+                           ('estimation_scan',ofdm.estimation_canal_scan),
+                           ('estimation_trame',ofdm.estimation_canal_trame)]:
+        etages[nom]=estimateur(Y,QPSK[:,PP],PP,Es,N0)
+    H_est=etages['estimation_cache']
+    QPSK_est=ofdm.decision(Y/H_est/Es**0.5)
+    etages['decision']=QPSK_est
+    # récepteur en flux sur le même signal, par blocs (synchronisation
+    # propre et réutilisation de l'estimée du canal si synchro)
+    recepteur=RecepteurOFDM(N,L,K,Ts,PP,QPSK[:,PP],Es,N0,
+                            theta=None if synchro else theta,
+                            Df=None if synchro else Df,
+                            coherence=4 if synchro else None)
+    decisions=[]
+    for a in range(0,len(y),20000):
+        decisions+=[QPSK_i for i,QPSK_i in recepteur.traiter(y[a:a+20000])]
+    etages['recepteur (tampon)']=recepteur.tampon
+    etages['recepteur']=np.array(decisions)
+    for nom,v in etages.items():
+        if v.dtype!=dtype:
+            raise AssertionError('étage %s: %s au lieu de %s'%(nom,v.dtype,dtype))
+    return QPSK_est
+
+def erreurs_binaires(QPSK_est,QPSK):
+    donnees=np.ones(K,dtype=bool)
+    donnees[PP]=False
+    err=np.concatenate(((np.real(QPSK_est)*np.real(QPSK)<0)[:,donnees],
+                        (np.imag(QPSK_est)*np.imag(QPSK)<0)[:,donnees]),axis=1)
+    return err
+
+################################################################################
+# Comparaison appariée: mêmes symboles, canal et bruit dans les deux précisions
+################################################################################
+rng=np.random.default_rng(0)
+for EsN0dB in EsN0dB_liste:
+    N0=Es/np.power(10,EsN0dB/10)
+    err64=err128=discordants=bits=0
+    for r in range(nb_realisations):
+        QPSK=np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K))
+        c=ofdm.reponse_canal(L,1,Tm,rng)
+        bruit=ofdm.bruit_BABG(theta+T*(N+L)+L-1,N0,rng)
+        synchro=(r%2==1)
+        e128=erreurs_binaires(chaine(QPSK,c,bruit,N0,synchro),QPSK)
+        Q64=QPSK.astype(np.complex64)
+        e64=erreurs_binaires(chaine(Q64,c.astype(np.complex64),
+                                    bruit.astype(np.complex64),N0,synchro),Q64)
+        err128+=np.sum(e128)
+        err64+=np.sum(e64)
+        discordants+=np.sum(e128!=e64)
+        bits+=e128.size
+    print('Es/N0=%2d dB  TEB complex128=%.4e  TEB complex64=%.4e  bits discordants=%d'%
+          (EsN0dB,err128/bits,err64/bits,discordants))
+    # écart compatible avec les seules décisions discordantes (test de McNemar)
+    if abs(err64-err128)>3*np.sqrt(discordants)+1:
+        raise AssertionError('TEB complex64 différent du TEB complex128 à %d dB'%EsN0dB)
+################################################################################
+# Rejeu de captures IQ (complex64 et int16) par le récepteur en flux, comparé
+# au même signal reçu traité en complex128
+################################################################################
+def rejeu(blocs,QPSK,N0,dtype=None):
+    recepteur=RecepteurOFDM(N,L,K,Ts,PP,QPSK[:,PP],Es,N0,preambule=True,dtype=dtype)
+    decisions=[]
+    for bloc in blocs:
+        decisions+=[QPSK_i for i,QPSK_i in recepteur.traiter(bloc)]
+    return np.array(decisions)
+
+EsN0dB=25
+N0=Es/np.power(10,EsN0dB/10)
+QPSK=np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K))
+s=np.concatenate((np.zeros(10000),synchro_preambule.preambule(N,L,K)[1],
+                  ofdm.modulation_OFDM_trame(Es**0.5*QPSK,N,L,e).ravel()))
+y=canal.convolution_canal(ofdm.decalage_frequence(s,Df,Ts,N+L),
+                          ofdm.reponse_canal(L,1,Tm,rng))
+y+=ofdm.bruit_BABG(len(y),N0,rng)
+QPSK_128=rejeu([y],QPSK,N0)
+e128=erreurs_binaires(QPSK_128,QPSK)
+# symboles erronés comptés comme rejeu_iq (décisions / symboles émis)
+nb_err128=ofdm.erreurs_QPSK(QPSK_128,QPSK)
+with tempfile.TemporaryDirectory() as dossier:
+    for format in iq.FORMATS:
+        fichier=os.path.join(dossier,'capture_%s.iq'%format)
+        iq.ecrire_iq(fichier,y,Ts,N,L,p['Kmax'],Df,format)
+        capture=iq.CaptureIQ(fichier)
+        QPSK_est=rejeu((bloc for debut,bloc in capture.blocs(1<<16)),QPSK,N0)
+        if QPSK_est.dtype!=np.complex64 or QPSK_est.shape!=QPSK.shape:
+            raise AssertionError('rejeu %s: %s %s au lieu de complex64 %s'%
+                                 (format,QPSK_est.shape,QPSK_est.dtype,QPSK.shape))
+        e64=erreurs_binaires(QPSK_est,QPSK)
+        discordants=np.sum(e128!=e64)
+        # décisions complex64, symboles émis complex128
+        nb_err=ofdm.erreurs_QPSK(QPSK_est,QPSK)
+        print('rejeu %-9s  TEB complex128=%.4e  TEB capture=%.4e  bits discordants=%d'
+              '  symboles erronés %d/%d'%(format,np.mean(e128),np.mean(e64),
+              discordants,nb_err,nb_err128))
+        if abs(np.sum(e64)-np.sum(e128))>3*np.sqrt(discordants)+1:
+            raise AssertionError('TEB du rejeu %s différent du TEB complex128'%format)
+        if abs(nb_err-nb_err128)>3*np.sqrt(discordants)+1:
+            raise AssertionError('TES du rejeu %s différent du TES complex128'%format)
+        del capture
+print('chaîne complex64 validée')
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# Nom du fichier: verification_equivalences.py
+# Ce script vérifie que les versions rapides des étages de la chaîne OFDM
+# (traitement par trame, caches, balayages parallèles, overlap-save) donnent
+# le même résultat que leur implémentation de référence, en double et en
+# simple précision. Il s'arrête à la première différence.
+#
+# exemple: python verification_equivalences.py
+import numpy as np
+
+import ofdm_canal as canal
+import ofdm_fonctions as ofdm
+from ofdm_balayage import parametres_OFDM
+
+################################################################################
+# Définition des paramètres
+################################################################################
+p=parametres_OFDM()
+N,L,Ts,Es,e=p['N'],p['L'],p['Ts'],p['Es'],p['e']
+K=p['Kmax']-p['Kmin']+1
+PP=np.arange(0,K,p['pas_pilotes'])
+# nombre de symboles OFDM par trame
+T=4
+# tolérance relative (norme infinie) selon la précision
+TOLERANCE={np.dtype('complex128'):1e-9,np.dtype('complex64'):1e-4}
+
+rng=np.random.default_rng(0)
+
+#####################################################################
+#  Comparaison d'un résultat à sa référence: même forme, même précision
+#  que l'entrée et écart relatif inférieur à la tolérance (par défaut
+#  celle de TOLERANCE pour la précision)
+#####################################################################
+def verifier(nom,obtenu,reference,dtype,tolerance=None):
+    dtype=np.dtype(dtype)
+    if tolerance is None:
+        tolerance=TOLERANCE[dtype]
+    obtenu=np.asarray(obtenu)
+    reference=np.asarray(reference)
+    if obtenu.shape!=reference.shape:
+        raise AssertionError('%s: forme %s au lieu de %s'%(nom,obtenu.shape,reference.shape))
+    if obtenu.dtype!=dtype:
+        raise AssertionError('%s: %s au lieu de %s'%(nom,obtenu.dtype,dtype))
+    ecart=np.max(np.abs(obtenu-reference))/max(np.max(np.abs(reference)),1e-30)
+    if not ecart<=tolerance:
+        raise AssertionError('%s (%s): écart relatif %.2e'%(nom,dtype,ecart))
+    print('%-40s %-10s écart relatif %.2e'%(nom,dtype,ecart))
+
+################################################################################
+# Modulation OFDM par trame / symbole par symbole
+################################################################################
+for dtype in TOLERANCE:
+    QPSK=np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K)).astype(dtype)
+    reference=np.array([ofdm.modulation_OFDM(QPSK[t],N,L,e) for t in range(T)])
+    verifier('modulation_OFDM_trame',ofdm.modulation_OFDM_trame(QPSK,N,L,e),
+             reference,dtype)
+    # un seul symbole OFDM (entrée 1-D)
+    verifier('modulation_OFDM_trame (1 symbole)',
+             ofdm.modulation_OFDM_trame(QPSK[0],N,L,e),reference[0:1],dtype)
+
+################################################################################
+# Démodulation OFDM par trame / symbole par symbole
+################################################################################
+theta,Df=p['theta'],p['Df']
+for dtype in TOLERANCE:
+    QPSK=np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K))
+    s=np.concatenate((np.zeros(theta),ofdm.modulation_OFDM_trame(QPSK,N,L,e).ravel(),
+                      np.zeros(L)))
+    y=(ofdm.decalage_frequence(s,Df,Ts,N+L)+ofdm.bruit_BABG(len(s),0.01,rng)).astype(dtype)
+    reference=np.empty((T,K),dtype=complex)
+    for i in range(T):
+        # partie utile du i-ème symbole OFDM (après l'intervalle de garde)
+        k=theta+L+np.arange(N)+i*(N+L)
+        z=y[k]*np.exp(-1j*2.0*np.pi*Df*k*Ts)
+        reference[i]=(np.fft.fft(z,N)/np.sqrt(N))[0:K]
+    verifier('demodulation_OFDM_trame',
+             ofdm.demodulation_OFDM_trame(y,theta,Df,N,L,T,K,Ts),reference,dtype)
+
+################################################################################
+# Décalage en fréquence sur un long signal (10000 symboles OFDM et un bloc
+# incomplet) / exponentielle complexe calculée directement: la phase ne
+# doit pas dériver d'un bloc à l'autre, même en simple précision
+################################################################################
+nb=10000*(N+L)+100
+k=np.arange(nb)
+reference=np.exp(1j*2.0*np.pi*Df*Ts*k)
+for dtype in TOLERANCE:
+    s=ofdm.decalage_frequence(np.ones(nb,dtype=dtype),Df,Ts,N+L)
+    verifier('decalage_frequence (10000 symboles)',s,reference,dtype,
+             tolerance=min(TOLERANCE[dtype],1e-6))
+    # démodulation des derniers symboles: phase en theta_est grand
+    y=np.ones(nb,dtype=dtype)
+    theta_est=9990*(N+L)
+    Y=ofdm.demodulation_OFDM_trame(y,theta_est,-Df,N,L,T,K,Ts)
+    i=theta_est+L+np.arange(T)[:,None]*(N+L)+np.arange(N)
+    verifier('demodulation_OFDM_trame (theta=%d)'%theta_est,Y,
+             (np.fft.fft(np.exp(1j*2.0*np.pi*Df*Ts*i),N,axis=1)/np.sqrt(N))[:,0:K],
+             dtype,tolerance=min(TOLERANCE[dtype],1e-5))
+
+################################################################################
+# Métrique temporelle par sommes cumulées / sommes directes, sur les
+# derniers délais d'un long signal: une somme cumulée accumulée en simple
+# précision y dérive d'environ 1e-5 en relatif, d'où la tolérance réduite
+################################################################################
+nb=1<<20
+for dtype in TOLERANCE:
+    y=ofdm.bruit_BABG(N+nb+L-1,1.0,rng,dtype=dtype)
+    d=np.concatenate((np.arange(0,nb,nb//64),np.arange(nb-256,nb)))
+    y2=y.astype(complex)
+    fenetres=d[:,None]+np.arange(L)
+    reference=np.sum(y2[fenetres]*np.conj(y2[fenetres+N]),axis=1)
+    verifier('metrique_temporelle',ofdm.metrique_temporelle(y,L,N,nb)[d],
+             reference,dtype,tolerance=min(TOLERANCE[dtype],1e-6))
+
+################################################################################
+# Estimateurs de canal de Kalman (trame, gains en cache, balayages
+# parallèles) / estimation_canal symbole par symbole
+################################################################################
+N0=0.01
+for dtype in TOLERANCE:
+    H=np.fft.fft(ofdm.reponse_canal(L,1,10,rng),N)[0:K]
+    QPSK=np.reshape(ofdm.gen_QPSK(T*K,rng),(T,K))
+    Y=(Es**0.5*H*QPSK+ofdm.bruit_BABG(T*K,N0,rng).reshape(T,K)).astype(dtype)
+    pilotes=QPSK[:,PP].astype(dtype)
+    reference=np.array([ofdm.estimation_canal(Y[t].astype(complex),
+                        pilotes[t].astype(complex),PP,Es,N0) for t in range(T)])
+    for nom,estimateur in [('estimation_canal_trame',ofdm.estimation_canal_trame),
+                           ('estimation_canal_cache',ofdm.estimation_canal_cache),
+                           ('estimation_canal_scan',ofdm.estimation_canal_scan)]:
+        verifier(nom,estimateur(Y,pilotes,PP,Es,N0),reference,dtype)
+    for nom,estimateur in [('estimation_canal_cache (1 symbole)',ofdm.estimation_canal_cache),
+                           ('estimation_canal_scan (1 symbole)',ofdm.estimation_canal_scan)]:
+        verifier(nom,estimateur(Y[0],pilotes[0],PP,Es,N0),reference[0],dtype)
+    # pilotes ne commençant pas à la première sous-porteuse
+    PP5=PP[PP+5<K]+5
+    reference=np.array([ofdm.estimation_canal(Y[t].astype(complex),
+                        pilotes[t,0:len(PP5)].astype(complex),PP5,Es,N0) for t in range(T)])
+    for nom,estimateur in [('estimation_canal_cache (pilotes décalés)',ofdm.estimation_canal_cache),
+                           ('estimation_canal_scan (pilotes décalés)',ofdm.estimation_canal_scan)]:
+        verifier(nom,estimateur(Y,pilotes[:,0:len(PP5)],PP5,Es,N0),reference,dtype)
+    # tous les estimateurs du registre, via estimation_canal_selection: même
+    # forme et même précision que Y, et un symbole seul (entrée 1-D) estimé
+    # comme la ligne correspondante de la trame
+    for nom in ofdm.ESTIMATEURS:
+        H_trame=ofdm.estimation_canal_selection(nom,Y,pilotes,PP,Es,N0)
+        if H_trame.shape!=Y.shape or H_trame.dtype!=Y.dtype:
+            raise AssertionError('ESTIMATEURS[%r]: %s %s au lieu de %s %s'%(nom,
+                                 H_trame.shape,H_trame.dtype,Y.shape,Y.dtype))
+        for t in (0,T-1):
+            verifier('ESTIMATEURS[%r] (symbole %d)'%(nom,t),
+                     ofdm.estimation_canal_selection(nom,Y[t],pilotes[t],PP,Es,N0),
+                     H_trame[t],dtype)
+
+################################################################################
+# Convolution par le canal: overlap-save (un canal, banque de canaux, en
+# flux par blocs) / np.convolve
+################################################################################
+for dtype in TOLERANCE:
+    s=ofdm.bruit_BABG(50000,1.0,rng,dtype=dtype)
+    c=ofdm.reponse_canal(L,1,10,rng,dtype=dtype)
+    reference=np.convolve(s.astype(complex),c.astype(complex))
+    verifier('convolution_canal (fft)',canal.convolution_canal(s,c,'fft'),
+             reference,dtype)
+    verifier('convolution_canal (directe)',canal.convolution_canal(s,c,'directe'),
+             reference,dtype)
+    c=canal.banque_canaux(3,L,1,10,rng=rng,dtype=dtype)
+    reference=np.array([np.convolve(s.astype(complex),c[m].astype(complex))
+                        for m in range(len(c))])
+    verifier('convolution_canal (banque de canaux)',canal.convolution_canal(s,c,'fft'),
+             reference,dtype)
+    # en flux, par blocs de tailles irrégulières
+    filtre=canal.ConvolutionFlux(c[0])
+    bornes=[0,1,700,20000,20001,50000]
+    sortie=[filtre.filtrer(s[a:b]) for a,b in zip(bornes[:-1],bornes[1:])]
+    verifier('ConvolutionFlux',np.concatenate(sortie+[filtre.vider()]),
+             reference[0],dtype)
+
+################################################################################
+# Canal à effet Doppler: sans Doppler (fD=0), canal fixe / np.convolve, en
+# une fois et en flux
+################################################################################
+for dtype in TOLERANCE:
+    s=ofdm.bruit_BABG(5000,1.0,rng,dtype=dtype)
+    for pas in (1,N+L):
+        c=canal.CanalDoppler(L,10,0.0,Ts,pas=pas,rng=rng,dtype=dtype)
+        reference=np.convolve(s.astype(complex),c.coefficients(0,1)[0].astype(complex))
+        verifier('CanalDoppler fD=0 (pas=%d)'%pas,c.appliquer(s),reference,dtype)
+        bornes=[0,1,700,4000,5000]
+        sortie=[c.filtrer(s[a:b]) for a,b in zip(bornes[:-1],bornes[1:])]
+        verifier('CanalDoppler fD=0 en flux (pas=%d)'%pas,
+                 np.concatenate(sortie+[c.vider()]),reference,dtype)
+    # avec Doppler: le temps du canal avance d'un bloc à l'autre en flux
+    c=canal.CanalDoppler(L,10,500.0,Ts,pas=37,rng=rng,dtype=dtype)
+    sortie=[c.filtrer(s[a:b]) for a,b in zip(bornes[:-1],bornes[1:])]
+    verifier('CanalDoppler fD=500 en flux (pas=37)',
+             np.concatenate(sortie+[c.vider()]),c.appliquer(s),dtype)
+
+################################################################################
+# Canal à effet Doppler: fonction d'autocorrélation des coefficients
+# (moyenne sur les réalisations) / modèle de Clarke J0(2*pi*fD*tau), J0
+# calculée par J0(x)=1/pi*intégrale_0^pi cos(x*sin(u))du
+################################################################################
+fD=100.0
+pas=N+L
+retards=np.arange(40)
+tau=retards*pas*Ts
+u=(np.arange(4096)+0.5)*np.pi/4096
+J0=np.mean(np.cos(2.0*np.pi*fD*tau[:,None]*np.sin(u)),axis=1)
+R=np.zeros(len(retards),dtype=complex)
+for r in range(1000):
+    c=canal.CanalDoppler(8,2,fD,Ts,pas=pas,rng=rng)
+    # somme des 16 sinusoïdes de chaque coefficient (puissance 16)
+    g=c.coefficients(0,len(retards)*pas)[::pas]/c.a
+    R+=np.mean(g*np.conj(g[0]),axis=1)
+R/=1000*16
+# écart type de l'estimation de l'ordre de 1/sqrt(8000)
+ecart=np.max(np.abs(R-J0))
+if not ecart<=0.05:
+    raise AssertionError('autocorrélation CanalDoppler: écart %.2e à J0'%ecart)
+print('%-40s %-10s écart absolu %.2e'%('CanalDoppler autocorrélation / J0','complex128',ecart))
+
+print('équivalences vérifiées')